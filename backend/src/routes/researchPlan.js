@@ -8,12 +8,59 @@ import {
   buildAcademicResearchPlanMessages,
   generateAcademicResearchPlan,
 } from '../services/academicResearchPlanService.js'
-import { buildResearchPlanMessages, generateResearchPlan } from '../services/researchPlanService.js'
+import {
+  buildResearchPlanMessages,
+  generateResearchPlan,
+  isCompletePlan,
+} from '../services/researchPlanService.js'
+import {
+  buildLlmCacheKey,
+  getCachedLlmResult,
+  normalizeCacheText,
+  setCachedLlmResult,
+} from '../services/llmCache.js'
+import { JSON_RESPONSE_FORMAT } from '../services/serviceUtils.js'
 import { streamChat } from '../services/streamChatService.js'
 import { createSseStream, getSseConfig } from '../utils/sse.js'
 
 const router = express.Router()
 
+const SUPPORTED_PROVIDERS = new Set([
+  'gemini',
+  'openai',
+  'openai_compatibility',
+  'siliconflow',
+  'glm',
+  'modelscope',
+  'kimi',
+  'nvidia',
+])
+const SUPPORTED_PROVIDERS_TEXT = [...SUPPORTED_PROVIDERS].join(', ')
+
+// GLM and ModelScope think by default; plans are streamed without it unless requested
+const THINKING_DISABLED = Object.freeze({ type: 'disabled' })
+const DEFAULT_THINKING_BY_PROVIDER = Object.freeze({
+  glm: THINKING_DISABLED,
+  modelscope: THINKING_DISABLED,
+})
+
+// Prompt builder (streaming) and generator (non-streaming) per research type
+const RESEARCH_PLANNERS = {
+  general: {
+    label: 'General',
+    buildMessages: buildResearchPlanMessages,
+    generate: generateResearchPlan,
+  },
+  academic: {
+    label: 'Academic',
+    buildMessages: buildAcademicResearchPlanMessages,
+    generate: generateAcademicResearchPlan,
+  },
+}
+
+// Unknown research types fall back to the general planner
+const resolvePlanKind = researchType => (researchType === 'academic' ? 'academic' : 'general')
+
 /**
  * POST /api/research-plan
  * Generate a structured deep research plan
@@ -46,33 +93,18 @@ router.post('/research-plan', async (req, res) => {
       return res.status(400).json({ error: 'Missing required field: apiKey' })
     }
 
-    const supportedProviders = [
-      'gemini',
-      'openai',
-      'openai_compatibility',
-      'siliconflow',
-      'glm',
-      'modelscope',
-      'kimi',
-      'nvidia',
-    ]
-    if (!supportedProviders.includes(provider)) {
+    if (!SUPPORTED_PROVIDERS.has(provider)) {
       return res.status(400).json({
-        error: `Unsupported provider: ${provider}. Supported: ${supportedProviders.join(', ')}`,
+        error: `Unsupported provider: ${provider}. Supported: ${SUPPORTED_PROVIDERS_TEXT}`,
       })
     }
 
     console.log(`[API] generateResearchPlan: provider=${provider}, researchType=${researchType}`)
 
-    // Use academic research plan service for academic research
-    const planGenerator =
-      researchType === 'academic' ? generateAcademicResearchPlan : generateResearchPlan
-
-    console.log(
-      `[API] Selected plan generator: ${researchType === 'academic' ? 'Academic' : 'General'}`,
-    )
+    const planner = RESEARCH_PLANNERS[resolvePlanKind(researchType)]
+    console.log(`[API] Selected plan generator: ${planner.label}`)
 
-    const plan = await planGenerator(provider, message, apiKey, baseUrl, model)
+    const plan = await planner.generate(provider, message, apiKey, baseUrl, model)
 
     res.json({ plan })
   } catch (error) {
@@ -114,19 +146,9 @@ router.post('/research-plan-stream', async (req, res) => {
       return res.status(400).json({ error: 'Missing required field: apiKey' })
     }
 
-    const supportedProviders = [
-      'gemini',
-      'openai',
-      'openai_compatibility',
-      'siliconflow',
-      'glm',
-      'modelscope',
-      'kimi',
-      'nvidia',
-    ]
-    if (!supportedProviders.includes(provider)) {
+    if (!SUPPORTED_PROVIDERS.has(provider)) {
       return res.status(400).json({
-        error: `Unsupported provider: ${provider}. Supported: ${supportedProviders.join(', ')}`,
+        error: `Unsupported provider: ${provider}. Supported: ${SUPPORTED_PROVIDERS_TEXT}`,
       })
     }
 
@@ -144,28 +166,39 @@ router.post('/research-plan-stream', async (req, res) => {
     })
 
     const resolvedResponseFormat =
-      responseFormat ?? (provider !== 'gemini' ? { type: 'json_object' } : undefined)
-    const resolvedThinking =
-      thinking ??
-      (provider === 'glm' || provider === 'modelscope' ? { type: 'disabled' } : undefined)
-
-    // Select appropriate prompt builder based on research type
-    // Import for buildAcademicResearchPlanMessages is needed if not already present
-    // Since we can't easily add global imports here without potentially breaking things or duplicates,
-    // we should rely on existing imports. Currently generateAcademicResearchPlan handles the whole flow non-streaming.
-    // However, research-plan-stream uses streamChat service directly.
-    // We need to conditionally use the academic prompt builder.
-
-    // NOTE: We need to import buildAcademicResearchPlanMessages at the top of the file first.
-    // For now, let's assume the import will be added in a separate step or we add it here if possible.
-    // Actually, looking at the imports: import { generateAcademicResearchPlan } from '../services/academicResearchPlanService.js'
-    // It doesn't export buildAcademicResearchPlanMessages. I need to update the import first.
-
-    const isAcademic = researchType === 'academic'
-    const promptBuilder = isAcademic ? buildAcademicResearchPlanMessages : buildResearchPlanMessages
-    const promptMessages = promptBuilder(message)
-
-    console.log(`[API] Streaming research plan with type: ${isAcademic ? 'Academic' : 'General'}`)
+      responseFormat ?? (provider !== 'gemini' ? JSON_RESPONSE_FORMAT : undefined)
+    const resolvedThinking = thinking ?? DEFAULT_THINKING_BY_PROVIDER[provider]
+
+    const planKind = resolvePlanKind(researchType)
+    const planner = RESEARCH_PLANNERS[planKind]
+    const promptMessages = planner.buildMessages(message)
+
+    // Replay a recently generated plan for the same request in the normal event shape
+    const cacheKey = buildLlmCacheKey(`research-plan-stream:${planKind}`, [
+      provider,
+      baseUrl,
+      model,
+      apiKey,
+      normalizeCacheText(message),
+      resolvedResponseFormat,
+      resolvedThinking,
+      temperature,
+      top_k,
+      top_p,
+      frequency_penalty,
+      presence_penalty,
+      contextMessageLimit,
+    ])
+    const cachedPlan = getCachedLlmResult(cacheKey)
+    if (cachedPlan) {
+      if (cachedPlan.thought) sse.sendEvent({ type: 'thought', content: cachedPlan.thought })
+      sse.sendEvent({ type: 'text', content: cachedPlan.content })
+      sse.sendEvent({ type: 'done', content: cachedPlan.content, thought: cachedPlan.thought })
+      sse.close()
+      return
+    }
+
+    console.log(`[API] Streaming research plan with type: ${planner.label}`)
     for await (const chunk of streamChat({
       provider,
       apiKey,
@@ -182,6 +215,9 @@ router.post('/research-plan-stream', async (req, res) => {
       contextMessageLimit,
       signal: controller.signal,
     })) {
+      if (chunk?.type === 'done' && isCompletePlan(chunk.content)) {
+        setCachedLlmResult(cacheKey, { content: chunk.content, thought: chunk.thought })
+      }
       sse.sendEvent(chunk)
     }
 
@@ -18,7 +18,8 @@ const router = express.Router()
  *   "message": "User's first message",
  *   "apiKey": "API key for the provider",
  *   "baseUrl": "Custom base URL (optional)",
- *   "model": "model-name" (optional)
+ *   "model": "model-name" (optional),
+ *   "regenerate": true (optional, skip the cached title)
  * }
  *
  * Response:
@@ -29,7 +30,7 @@ const router = express.Router()
  */
 router.post('/title', async (req, res) => {
   try {
-    const { provider, message, apiKey, baseUrl, model } = req.body
+    const { provider, message, apiKey, baseUrl, model, regenerate } = req.body
 
     if (!provider || !message) {
       return res.status(400).json({ error: 'Missing required fields: provider, message' })
@@ -53,7 +54,9 @@ router.post('/title', async (req, res) => {
 
     console.log(`[API] generateTitle: provider=${provider}`)
 
-    const result = await generateTitle(provider, message, apiKey, baseUrl, model)
+    const result = await generateTitle(provider, message, apiKey, baseUrl, model, {
+      regenerate: regenerate === true,
+    })
 
     res.json({
       title: result?.title || 'New Conversation',
@@ -3,210 +3,16 @@
  * Specialized version for academic/scholarly research with stricter methodological requirements
  */
 
-import { ChatGoogleGenerativeAI } from '@langchain/google-genai'
-import { ChatOpenAI } from '@langchain/openai'
-import {
-  normalizeGeminiMessages,
-  normalizeTextContent,
-  safeJsonParse,
-  toLangChainMessages,
-} from './serviceUtils.js'
-
-// Import base URLs and models from the main research plan service
-const OPENAI_DEFAULT_BASE = 'https://api.openai.com/v1'
-const SILICONFLOW_BASE = 'https://api.siliconflow.cn/v1'
-const GLM_BASE = 'https://open.bigmodel.cn/api/paas/v4'
-const MODELSCOPE_BASE = 'https://api-inference.modelscope.cn/v1'
-const KIMI_BASE = 'https://api.moonshot.cn/v1'
-
-const DEFAULT_MODELS = {
-  gemini: 'gemini-2.0-flash-exp',
-  openai: 'gpt-4o-mini',
-  siliconflow: 'Qwen/Qwen2.5-7B-Instruct',
-  glm: 'glm-4-flash',
-  modelscope: 'AI-ModelScope/glm-4-9b-chat',
-  kimi: 'moonshot-v1-8k',
-}
-
-// ============================================================================
-// Model builders - Support all providers
-// ============================================================================
-
-const buildGeminiModel = ({ apiKey, model, temperature, top_k, top_p, streaming }) => {
-  if (!apiKey) throw new Error('Missing API key')
-  return new ChatGoogleGenerativeAI({
-    apiKey,
-    model: model || DEFAULT_MODELS.gemini,
-    temperature,
-    topK: top_k,
-    ...(top_p !== undefined ? { topP: top_p } : {}),
-    streaming,
-  })
-}
-
-const buildSiliconFlowModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  responseFormat,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-
-  const modelKwargs = {}
-  modelKwargs.response_format = responseFormat || { type: 'text' }
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.siliconflow,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: SILICONFLOW_BASE },
-  })
-}
-
-const buildGLMModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  responseFormat,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-
-  const modelKwargs = {}
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  modelKwargs.thinking = { type: 'disabled' }
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.glm,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: GLM_BASE },
-  })
-}
-
-const buildModelScopeModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  responseFormat,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-
-  const modelKwargs = {}
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  modelKwargs.thinking = { type: 'disabled' }
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.modelscope,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: MODELSCOPE_BASE },
-  })
-}
-
-const buildKimiModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  responseFormat,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-
-  const modelKwargs = {}
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.kimi,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: KIMI_BASE },
-  })
-}
-
-const buildOpenAIModel = ({
-  apiKey,
-  baseUrl,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  responseFormat,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-
-  const resolvedBase = baseUrl || OPENAI_DEFAULT_BASE
-
-  const modelKwargs = {}
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.openai,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: resolvedBase },
-  })
-}
+import { runResearchPlanner } from './researchPlanService.js'
 
 // ============================================================================
 // Academic Research Plan Prompt
 // ============================================================================
 
-export const buildAcademicResearchPlanMessages = userMessage => [
-  {
-    role: 'system',
-    content: `You are an academic research planner. Produce a detailed, rigorous research plan in structured JSON for scholarly literature review and analysis.
+// Frozen and shared like RESEARCH_PLAN_SYSTEM_MESSAGE in researchPlanService.js
+const ACADEMIC_RESEARCH_PLAN_SYSTEM_MESSAGE = Object.freeze({
+  role: 'system',
+  content: `You are an academic research planner. Produce a detailed, rigorous research plan in structured JSON for scholarly literature review and analysis.
 
 ## Input
 User message contains:
@@ -532,240 +338,25 @@ Return ONLY valid JSON, no markdown, no commentary:
   "risks": ["potential methodological issues", "evidence limitations", "generalizability concerns"],
   "success_criteria": ["scholarly standard for completion", "quality benchmark"]
 }`,
-  },
+})
+
+export const buildAcademicResearchPlanMessages = userMessage => [
+  ACADEMIC_RESEARCH_PLAN_SYSTEM_MESSAGE,
   { role: 'user', content: userMessage },
 ]
 
-// ============================================================================
-// Request functions - Support all providers
-// ============================================================================
-
-const requestGemini = async ({ apiKey, model, messages, temperature, top_k, top_p, signal }) => {
-  const modelInstance = buildGeminiModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    streaming: false,
-  })
-
-  const orderedMessages = normalizeGeminiMessages(messages || [])
-  const langchainMessages = toLangChainMessages(orderedMessages)
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestSiliconFlow = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  responseFormat,
-  signal,
-}) => {
-  const modelInstance = buildSiliconFlowModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    responseFormat,
-    streaming: false,
-  })
-
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestGLM = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  responseFormat,
-  signal,
-}) => {
-  const modelInstance = buildGLMModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    responseFormat,
-    streaming: false,
-  })
-
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestModelScope = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  responseFormat,
-  signal,
-}) => {
-  const modelInstance = buildModelScopeModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    responseFormat,
-    streaming: false,
-  })
-
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestKimi = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  responseFormat,
-  signal,
-}) => {
-  const modelInstance = buildKimiModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    responseFormat,
-    streaming: false,
-  })
-
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestOpenAI = async ({
-  apiKey,
-  baseUrl,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  responseFormat,
-  signal,
-}) => {
-  const modelInstance = buildOpenAIModel({
-    apiKey,
-    baseUrl,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    responseFormat,
-    streaming: false,
-  })
-
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
 /**
  * Generate an academic research plan using a lightweight model
  * Supports all providers: gemini, siliconflow, glm, modelscope, kimi, openai_compatibility
+ * Repeated questions within the cache TTL reuse the previous plan.
  */
-export const generateAcademicResearchPlan = async (
-  provider,
-  userMessage,
-  apiKey,
-  baseUrl,
-  model,
-) => {
+export const generateAcademicResearchPlan = (provider, userMessage, apiKey, baseUrl, model) => {
   console.log('[AcademicPlanService] Generating academic research plan...')
-  const promptMessages = buildAcademicResearchPlanMessages(userMessage)
-  const responseFormat = provider !== 'gemini' ? { type: 'json_object' } : undefined
-
-  let content = undefined
-
-  if (provider === 'gemini') {
-    content = await requestGemini({ apiKey, model, messages: promptMessages })
-  } else if (provider === 'siliconflow') {
-    content = await requestSiliconFlow({ apiKey, model, messages: promptMessages, responseFormat })
-  } else if (provider === 'glm') {
-    content = await requestGLM({ apiKey, model, messages: promptMessages, responseFormat })
-  } else if (provider === 'modelscope') {
-    content = await requestModelScope({ apiKey, model, messages: promptMessages, responseFormat })
-  } else if (provider === 'kimi') {
-    content = await requestKimi({ apiKey, model, messages: promptMessages, responseFormat })
-  } else {
-    // openai_compatibility or default
-    content = await requestOpenAI({
-      apiKey,
-      baseUrl,
-      model,
-      messages: promptMessages,
-      responseFormat,
-    })
-  }
-
-  const parsed = safeJsonParse(content)
-  if (parsed) {
-    try {
-      return JSON.stringify(parsed, null, 2)
-    } catch {
-      return content?.trim?.() || ''
-    }
-  }
-  return content?.trim?.() || ''
+  return runResearchPlanner('academic', buildAcademicResearchPlanMessages, {
+    provider,
+    userMessage,
+    apiKey,
+    baseUrl,
+    model,
+  })
 }
@@ -2,425 +2,15 @@
  * Agent for Auto mode generation service
  */
 
-import { ChatGoogleGenerativeAI } from '@langchain/google-genai'
-import { ChatOpenAI } from '@langchain/openai'
-import {
-  normalizeGeminiMessages,
-  normalizeTextContent,
-  safeJsonParse,
-  toLangChainMessages,
-} from './serviceUtils.js'
+import { requestCompletion } from './completionService.js'
+import { JSON_RESPONSE_FORMAT, buildAgentTokens, safeJsonParse } from './serviceUtils.js'
 
-// Default base URLs
-const OPENAI_DEFAULT_BASE = 'https://api.openai.com/v1'
-const SILICONFLOW_BASE = 'https://api.siliconflow.cn/v1'
-const GLM_BASE = 'https://open.bigmodel.cn/api/paas/v4'
-const MODELSCOPE_BASE = 'https://api-inference.modelscope.cn/v1'
-const KIMI_BASE = 'https://api.moonshot.cn/v1'
-
-// Default models
-const DEFAULT_MODELS = {
-  gemini: 'gemini-2.0-flash-exp',
-  openai: 'gpt-4o-mini',
-  siliconflow: 'Qwen/Qwen2.5-7B-Instruct',
-  glm: 'glm-4-flash',
-  modelscope: 'AI-ModelScope/glm-4-9b-chat',
-  kimi: 'moonshot-v1-8k',
-}
-
-// ============================================================================
-// Model builders
-// ============================================================================
-
-const buildGeminiModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  tools,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-  return new ChatGoogleGenerativeAI({
-    apiKey,
-    model: model || DEFAULT_MODELS.gemini,
-    temperature,
-    topK: top_k,
-    ...(top_p !== undefined ? { topP: top_p } : {}),
-    streaming,
-  })
-}
-
-const buildSiliconFlowModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-  const modelKwargs = {}
-  modelKwargs.response_format = responseFormat || { type: 'text' }
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.siliconflow,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: SILICONFLOW_BASE },
-  })
-}
-
-const buildGLMModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-  const modelKwargs = {}
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  modelKwargs.thinking = { type: thinking?.type || 'disabled' }
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.glm,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: GLM_BASE },
-  })
-}
-
-const buildModelScopeModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-  const modelKwargs = {}
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  modelKwargs.thinking = { type: thinking?.type || 'disabled' }
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.modelscope,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: MODELSCOPE_BASE },
-  })
-}
-
-const buildKimiModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-  const modelKwargs = {}
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.kimi,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: KIMI_BASE },
-  })
-}
-
-const buildOpenAIModel = ({
-  provider,
-  apiKey,
-  baseUrl,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-  const resolvedBase = baseUrl || OPENAI_DEFAULT_BASE
-  const modelKwargs = {}
-  if (tools && tools.length > 0) modelKwargs.tools = tools
-  if (toolChoice) modelKwargs.tool_choice = toolChoice
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.openai,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: resolvedBase },
-  })
-}
-
-// ============================================================================
-// Request functions
-// ============================================================================
-
-const requestGemini = async ({ apiKey, model, messages, temperature, top_k, top_p, signal }) => {
-  const modelInstance = buildGeminiModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    tools: [],
-    thinking: false,
-    streaming: false,
-  })
-  const orderedMessages = normalizeGeminiMessages(messages || [])
-  const langchainMessages = toLangChainMessages(orderedMessages)
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestSiliconFlow = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  signal,
-}) => {
-  const modelInstance = buildSiliconFlowModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    tools: [],
-    toolChoice,
-    responseFormat,
-    thinking,
-    streaming: false,
-  })
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestGLM = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  signal,
-}) => {
-  const modelInstance = buildGLMModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    tools: [],
-    toolChoice,
-    responseFormat,
-    thinking: { type: 'disabled' },
-    streaming: false,
-  })
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestModelScope = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  signal,
-}) => {
-  const modelInstance = buildModelScopeModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    tools: [],
-    toolChoice,
-    responseFormat,
-    thinking: { type: 'disabled' },
-    streaming: false,
-  })
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestKimi = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  signal,
-}) => {
-  const modelInstance = buildKimiModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    tools: [],
-    toolChoice,
-    responseFormat,
-    thinking: undefined,
-    streaming: false,
-  })
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
+const AGENT_FOR_AUTO_SYSTEM_PROMPT = `You are a helpful assistant.
+## Task
+Select the best matching agent for the user's message from the agents listed after it. Consider the agent's name and description to determine which one is most appropriate. If no agent is a good match, return null.
 
-const requestOpenAICompat = async ({
-  provider,
-  apiKey,
-  baseUrl,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  signal,
-}) => {
-  const modelInstance = buildOpenAIModel({
-    provider,
-    apiKey,
-    baseUrl,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    tools: [],
-    toolChoice,
-    responseFormat,
-    thinking,
-    streaming: false,
-  })
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
+## Output
+Return the result as JSON with key "agentName" (agent name only, or null if no match).`
 
 /**
  * Generate agent for auto mode
@@ -433,92 +23,24 @@ export const generateAgentForAuto = async (
   baseUrl,
   model,
 ) => {
-  const sanitizeOptionText = text =>
-    String(text || '')
-      .replace(/[\r\n]+/g, ' ')
-      .replace(/[{}]/g, '')
-      .replace(/\s+/g, ' ')
-      .trim()
-
-  const agentEntries = (currentSpace?.agents || []).map(agent => {
-    if (typeof agent === 'string') {
-      return { name: agent }
-    }
-    return {
-      name: typeof agent?.name === 'string' ? agent.name : '',
-      description: agent?.description ?? '',
-    }
-  })
-
-  const agentTokens = agentEntries
-    .map(agent => {
-      const name = sanitizeOptionText(agent.name)
-      const description = sanitizeOptionText(agent.description)
-      if (name && description) return `${name} - ${description}`
-      if (name) return name
-      return ''
-    })
-    .filter(Boolean)
-    .join('\n')
+  const agentTokens = buildAgentTokens(currentSpace?.agents).join('\n')
 
   const promptMessages = [
-    {
-      role: 'system',
-      content: `You are a helpful assistant.
-## Task
-Select the best matching agent for the user's message from the "${currentSpace?.label || 'Default'}" space. Consider the agent's name and description to determine which one is most appropriate. If no agent is a good match, return null.
-
-## Output
-Return the result as JSON with key "agentName" (agent name only, or null if no match).`,
-    },
+    { role: 'system', content: AGENT_FOR_AUTO_SYSTEM_PROMPT },
     {
       role: 'user',
       content: `${userMessage}\n\nAvailable agents in ${currentSpace?.label || 'this space'}:\n${agentTokens}`,
     },
   ]
 
-  const responseFormat = provider !== 'gemini' ? { type: 'json_object' } : undefined
-  let content = undefined
-  if (provider === 'gemini') {
-    content = await requestGemini({ apiKey, model, messages: promptMessages })
-  } else if (provider === 'siliconflow') {
-    content = await requestSiliconFlow({
-      apiKey,
-      model,
-      messages: promptMessages,
-      responseFormat,
-    })
-  } else if (provider === 'glm') {
-    content = await requestGLM({
-      apiKey,
-      model,
-      messages: promptMessages,
-      responseFormat,
-    })
-  } else if (provider === 'modelscope') {
-    content = await requestModelScope({
-      apiKey,
-      model,
-      messages: promptMessages,
-      responseFormat,
-    })
-  } else if (provider === 'kimi') {
-    content = await requestKimi({
-      apiKey,
-      model,
-      messages: promptMessages,
-      responseFormat,
-    })
-  } else {
-    content = await requestOpenAICompat({
-      provider,
-      apiKey,
-      baseUrl,
-      model,
-      messages: promptMessages,
-      responseFormat,
-    })
-  }
+  const responseFormat = provider !== 'gemini' ? JSON_RESPONSE_FORMAT : undefined
+  const content = await requestCompletion(provider, {
+    apiKey,
+    baseUrl,
+    model,
+    messages: promptMessages,
+    responseFormat,
+  })
   const parsed = safeJsonParse(content) || {}
   return parsed.agentName || null
 }
@@ -0,0 +1,244 @@
+/**
+ * Non-streaming completion requests shared by the helper services
+ * (title, space/agent selection, related questions, daily tip, research plans)
+ *
+ * Model instances are pooled by their construction options so repeated helper
+ * calls reuse the same client (and its keep-alive connections) instead of
+ * building a new one per request.
+ */
+
+import { ChatGoogleGenerativeAI } from '@langchain/google-genai'
+import { ChatOpenAI } from '@langchain/openai'
+import {
+  normalizeGeminiMessages,
+  normalizeTextContent,
+  toLangChainMessages,
+} from './serviceUtils.js'
+
+const debugPromptCache = () => process.env.DEBUG_PROMPT_CACHE === '1'
+
+// Default base URLs
+const OPENAI_DEFAULT_BASE = 'https://api.openai.com/v1'
+const SILICONFLOW_BASE = 'https://api.siliconflow.cn/v1'
+const GLM_BASE = 'https://open.bigmodel.cn/api/paas/v4'
+const MODELSCOPE_BASE = 'https://api-inference.modelscope.cn/v1'
+const KIMI_BASE = 'https://api.moonshot.cn/v1'
+
+// Default models
+const DEFAULT_MODELS = {
+  gemini: 'gemini-2.0-flash-exp',
+  openai: 'gpt-4o-mini',
+  siliconflow: 'Qwen/Qwen2.5-7B-Instruct',
+  glm: 'glm-4-flash',
+  modelscope: 'AI-ModelScope/glm-4-9b-chat',
+  kimi: 'moonshot-v1-8k',
+}
+
+// ============================================================================
+// Model builders
+// ============================================================================
+
+const buildSamplingKwargs = ({ top_k, top_p, frequency_penalty, presence_penalty }) => {
+  const modelKwargs = {}
+  if (top_k !== undefined) modelKwargs.top_k = top_k
+  if (top_p !== undefined) modelKwargs.top_p = top_p
+  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
+  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
+  return modelKwargs
+}
+
+const buildGeminiModel = ({ apiKey, model, temperature, top_k, top_p }) => {
+  if (!apiKey) throw new Error('Missing API key')
+
+  return new ChatGoogleGenerativeAI({
+    apiKey,
+    model: model || DEFAULT_MODELS.gemini,
+    temperature,
+    topK: top_k,
+    ...(top_p !== undefined ? { topP: top_p } : {}),
+    streaming: false,
+  })
+}
+
+const buildSiliconFlowModel = ({ apiKey, model, temperature, responseFormat, ...sampling }) => {
+  if (!apiKey) throw new Error('Missing API key')
+
+  return new ChatOpenAI({
+    apiKey,
+    modelName: model || DEFAULT_MODELS.siliconflow,
+    temperature,
+    streaming: false,
+    modelKwargs: {
+      response_format: responseFormat || { type: 'text' },
+      ...buildSamplingKwargs(sampling),
+    },
+    configuration: { baseURL: SILICONFLOW_BASE },
+  })
+}
+
+// GLM and ModelScope enable thinking by default; helpers never want it
+const buildThinkingDisabledModel = (
+  baseURL,
+  defaultModel,
+  { apiKey, model, temperature, responseFormat, ...sampling },
+) => {
+  if (!apiKey) throw new Error('Missing API key')
+
+  const modelKwargs = {}
+  if (responseFormat) modelKwargs.response_format = responseFormat
+  modelKwargs.thinking = { type: 'disabled' }
+
+  return new ChatOpenAI({
+    apiKey,
+    modelName: model || defaultModel,
+    temperature,
+    streaming: false,
+    modelKwargs: { ...modelKwargs, ...buildSamplingKwargs(sampling) },
+    configuration: { baseURL },
+  })
+}
+
+const buildGLMModel = options => buildThinkingDisabledModel(GLM_BASE, DEFAULT_MODELS.glm, options)
+
+const buildModelScopeModel = options =>
+  buildThinkingDisabledModel(MODELSCOPE_BASE, DEFAULT_MODELS.modelscope, options)
+
+const buildKimiModel = ({ apiKey, model, temperature, responseFormat, ...sampling }) => {
+  if (!apiKey) throw new Error('Missing API key')
+
+  const modelKwargs = {}
+  if (responseFormat) modelKwargs.response_format = responseFormat
+
+  return new ChatOpenAI({
+    apiKey,
+    modelName: model || DEFAULT_MODELS.kimi,
+    temperature,
+    streaming: false,
+    modelKwargs: { ...modelKwargs, ...buildSamplingKwargs(sampling) },
+    configuration: { baseURL: KIMI_BASE },
+  })
+}
+
+const buildOpenAIModel = ({
+  apiKey,
+  baseUrl,
+  model,
+  temperature,
+  toolChoice,
+  responseFormat,
+  ...sampling
+}) => {
+  if (!apiKey) throw new Error('Missing API key')
+
+  const modelKwargs = {}
+  if (toolChoice) modelKwargs.tool_choice = toolChoice
+  if (responseFormat) modelKwargs.response_format = responseFormat
+
+  return new ChatOpenAI({
+    apiKey,
+    modelName: model || DEFAULT_MODELS.openai,
+    temperature,
+    streaming: false,
+    modelKwargs: { ...modelKwargs, ...buildSamplingKwargs(sampling) },
+    configuration: { baseURL: baseUrl || OPENAI_DEFAULT_BASE },
+  })
+}
+
+// ============================================================================
+// Model pool
+// ============================================================================
+
+const MODEL_POOL_LIMIT = 64
+const modelPool = new Map()
+
+const getPooledModel = (kind, builder, options) => {
+  const key = `${kind}:${JSON.stringify(options)}`
+  const cached = modelPool.get(key)
+  if (cached) {
+    modelPool.delete(key)
+    modelPool.set(key, cached)
+    return cached
+  }
+  const modelInstance = builder(options)
+  modelPool.set(key, modelInstance)
+  if (modelPool.size > MODEL_POOL_LIMIT) {
+    modelPool.delete(modelPool.keys().next().value)
+  }
+  return modelInstance
+}
+
+const invokeModel = async (modelInstance, langchainMessages, signal) => {
+  const response = await modelInstance.invoke(langchainMessages, { signal })
+  if (debugPromptCache()) {
+    // Static system prefixes (planner prompts, helper prompts) should show cache reads on repeats
+    const usage = response.usage_metadata
+    console.log(
+      `[Completion] input tokens: ${usage?.input_tokens ?? '?'}, cached: ${usage?.input_token_details?.cache_read ?? 0}`,
+    )
+  }
+  return typeof response.content === 'string'
+    ? response.content
+    : normalizeTextContent(response.content)
+}
+
+// ============================================================================
+// Request functions
+// ============================================================================
+
+const requestGemini = async ({ messages, signal, ...options }) => {
+  const modelInstance = getPooledModel('gemini', buildGeminiModel, {
+    apiKey: options.apiKey,
+    model: options.model,
+    temperature: options.temperature,
+    top_k: options.top_k,
+    top_p: options.top_p,
+  })
+  const orderedMessages = normalizeGeminiMessages(messages || [])
+  return invokeModel(modelInstance, toLangChainMessages(orderedMessages), signal)
+}
+
+const requestSiliconFlow = async ({ messages, signal, ...options }) => {
+  const modelInstance = getPooledModel('siliconflow', buildSiliconFlowModel, options)
+  return invokeModel(modelInstance, toLangChainMessages(messages || []), signal)
+}
+
+const requestGLM = async ({ messages, signal, ...options }) => {
+  const modelInstance = getPooledModel('glm', buildGLMModel, options)
+  return invokeModel(modelInstance, toLangChainMessages(messages || []), signal)
+}
+
+const requestModelScope = async ({ messages, signal, ...options }) => {
+  const modelInstance = getPooledModel('modelscope', buildModelScopeModel, options)
+  return invokeModel(modelInstance, toLangChainMessages(messages || []), signal)
+}
+
+const requestKimi = async ({ messages, signal, ...options }) => {
+  const modelInstance = getPooledModel('kimi', buildKimiModel, options)
+  return invokeModel(modelInstance, toLangChainMessages(messages || []), signal)
+}
+
+const requestOpenAICompat = async ({ messages, signal, ...options }) => {
+  const modelInstance = getPooledModel('openai', buildOpenAIModel, options)
+  return invokeModel(modelInstance, toLangChainMessages(messages || []), signal)
+}
+
+const REQUESTS_BY_PROVIDER = {
+  gemini: requestGemini,
+  siliconflow: requestSiliconFlow,
+  glm: requestGLM,
+  modelscope: requestModelScope,
+  kimi: requestKimi,
+}
+
+/**
+ * Run a non-streaming completion with the request function for provider
+ * Unknown providers go through the OpenAI-compatible path.
+ * @param {string} provider - Provider name
+ * @param {object} options - { apiKey, baseUrl, model, messages, responseFormat, signal, ... }
+ * @returns {Promise<string>} Response text
+ */
+export const requestCompletion = (provider, options) => {
+  const request = REQUESTS_BY_PROVIDER[provider]
+  if (request) return request(options)
+  return requestOpenAICompat({ provider, ...options })
+}
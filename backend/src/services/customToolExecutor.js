@@ -3,6 +3,14 @@
  * Executes user-defined tools (HTTP, MCP, etc.) with security validation
  */
 
+import { mcpToolManager } from './mcpToolManager.js'
+
+// First non-space character of any JSON value; plain-text output skips JSON.parse and its throw
+const JSON_VALUE_START_REGEX = /^\s*(?:[[{"\d-]|true|false|null)/
+
+// Tool argument dumps are only serialized when DEBUG_TOOLS=1
+const debugTools = () => process.env.DEBUG_TOOLS === '1'
+
 /**
  * Replace template variables in a string
  * Example: "{{city}}" with args.city = "Tokyo" becomes "Tokyo"
@@ -143,6 +151,7 @@ export async function executeHttpTool(tool, args) {
     }
 
     // 8. Parse JSON if possible
+    if (!JSON_VALUE_START_REGEX.test(text)) return { data: text }
     try {
       return JSON.parse(text)
     } catch {
@@ -160,28 +169,38 @@ export async function executeHttpTool(tool, args) {
   }
 }
 
+const collectMcpText = content => {
+  if (content.length === 1) {
+    return content[0]?.type === 'text' ? (content[0].text ?? '') : ''
+  }
+  const texts = []
+  for (const item of content) {
+    if (item?.type === 'text') texts.push(item.text)
+  }
+  return texts.join('\n')
+}
+
 /**
  * Execute MCP tool
  * Calls a tool from a connected MCP server
  */
 export async function executeMcpTool(tool, args) {
   try {
-    const { mcpToolManager } = await import('./mcpToolManager.js')
-
-    console.log(`[MCP Tool] Executing ${tool.id} with args:`, JSON.stringify(args, null, 2))
+    console.log(`[MCP Tool] Executing ${tool.id}`)
+    if (debugTools()) {
+      console.log(`[MCP Tool] ${tool.id} args:`, JSON.stringify(args, null, 2))
+    }
 
     // Call the MCP tool
     const result = await mcpToolManager.executeMcpTool(tool.id, args)
 
     // Extract and return content from MCP response
     if (result.content && result.content.length > 0) {
-      // Collect all text content
-      const textContent = result.content
-        .filter(item => item.type === 'text')
-        .map(item => item.text)
-        .join('\n')
+      // Collect all text content (single text item, the usual shape, is used as-is)
+      const textContent = collectMcpText(result.content)
 
       // Try to parse as JSON first
+      if (!JSON_VALUE_START_REGEX.test(textContent)) return { data: textContent }
       try {
         const parsed = JSON.parse(textContent)
         return { data: parsed, raw: textContent }
@@ -6,7 +6,12 @@
 import { ChatOpenAI } from '@langchain/openai'
 import { generateAcademicResearchPlan } from './academicResearchPlanService.js'
 import { generateResearchPlan } from './researchPlanService.js'
-import { normalizeTextContent, safeJsonParse, toLangChainMessages } from './serviceUtils.js'
+import {
+  elapsedMs,
+  normalizeTextContent,
+  safeJsonParse,
+  toLangChainMessages,
+} from './serviceUtils.js'
 import { executeToolByName, getToolDefinitionsByIds, isLocalToolName } from './toolsService.js'
 
 const OPENAI_DEFAULT_BASE = 'https://api.openai.com/v1'
@@ -451,7 +456,7 @@ const runToolCallingStep = async ({
             total: totalSteps,
           }),
         )
-        const startedAt = Date.now()
+        const startedAt = performance.now()
         const toolName = toolCall.function.name
 
         if (!isLocalToolName(toolName)) {
@@ -465,7 +470,7 @@ const runToolCallingStep = async ({
             buildToolResultEvent(
               toolCall,
               new Error(`Unknown tool: ${toolName}`),
-              Date.now() - startedAt,
+              elapsedMs(startedAt),
               undefined,
               {
                 step: typeof stepIndex === 'number' ? stepIndex + 1 : undefined,
@@ -488,7 +493,7 @@ const runToolCallingStep = async ({
             content: JSON.stringify(result),
           })
           toolEvents.push(
-            buildToolResultEvent(toolCall, null, Date.now() - startedAt, result, {
+            buildToolResultEvent(toolCall, null, elapsedMs(startedAt), result, {
               step: typeof stepIndex === 'number' ? stepIndex + 1 : undefined,
               total: totalSteps,
             }),
@@ -501,7 +506,7 @@ const runToolCallingStep = async ({
             content: JSON.stringify({ error: `Tool execution failed: ${error.message}` }),
           })
           toolEvents.push(
-            buildToolResultEvent(toolCall, error, Date.now() - startedAt, undefined, {
+            buildToolResultEvent(toolCall, error, elapsedMs(startedAt), undefined, {
               step: typeof stepIndex === 'number' ? stepIndex + 1 : undefined,
               total: totalSteps,
             }),
@@ -940,20 +945,20 @@ export const streamDeepResearch = async function* (params) {
     signal,
   })
 
-  let fullContent = ''
+  const contentParts = []
   for await (const chunk of streamIterator) {
     const messageChunk = chunk?.message ?? chunk
     const contentValue = messageChunk?.content ?? chunk?.content
     const chunkText = normalizeTextContent(contentValue)
     if (chunkText) {
-      fullContent += chunkText
+      contentParts.push(chunkText)
       yield { type: 'text', content: chunkText }
     }
   }
 
   yield {
     type: 'done',
-    content: fullContent,
+    content: contentParts.join(''),
     sources: sourcesMap.size ? Array.from(sourcesMap.values()) : undefined,
   }
 }
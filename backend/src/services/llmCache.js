@@ -0,0 +1,142 @@
+/**
+ * In-process cache for small helper LLM calls (titles, research plans)
+ * Results are keyed by a SHA-256 of the request inputs and kept for a short TTL.
+ * Concurrent callers with the same key share a single in-flight request.
+ * Values are cloned on store and on every hit, so callers never share objects.
+ *
+ * Set LLM_CACHE=0 to disable.
+ */
+
+import { createHash } from 'node:crypto'
+
+const DEFAULT_TTL_MS = 10 * 60 * 1000
+const DEFAULT_MAX_ENTRIES = 500
+
+// key -> { value, expiresAt }
+const entries = new Map()
+// key -> Promise
+const pending = new Map()
+
+const isCacheEnabled = () => process.env.LLM_CACHE !== '0'
+
+const getTtlMs = () => {
+  const ttl = Number.parseInt(process.env.LLM_CACHE_TTL_MS, 10)
+  return Number.isFinite(ttl) && ttl >= 0 ? ttl : DEFAULT_TTL_MS
+}
+
+const getMaxEntries = () => {
+  const max = Number.parseInt(process.env.LLM_CACHE_MAX_ENTRIES, 10)
+  return Number.isFinite(max) && max > 0 ? max : DEFAULT_MAX_ENTRIES
+}
+
+const CACHE_TEXT_WHITESPACE_REGEX = /\s+/g
+const CACHE_TEXT_TRAILING_PUNCTUATION_REGEX = /[\s.!?。！？…]+$/u
+
+/**
+ * Normalize free-form user text for use in a cache key
+ * Case, surrounding/repeated whitespace and trailing sentence punctuation are
+ * ignored so "What is HTTP?" and "what is http" share an entry. The original
+ * text is still what gets sent to the model on a miss.
+ * @param {string} text - User text
+ * @returns {string} Normalized text
+ */
+export const normalizeCacheText = text => {
+  if (typeof text !== 'string') return text
+  return text
+    .trim()
+    .replace(CACHE_TEXT_WHITESPACE_REGEX, ' ')
+    .replace(CACHE_TEXT_TRAILING_PUNCTUATION_REGEX, '')
+    .toLowerCase()
+}
+
+/**
+ * Build a cache key from a namespace and JSON-serializable inputs
+ * @param {string} namespace - Helper name (e.g. 'title')
+ * @param {Array} parts - Inputs that fully determine the request
+ * @returns {string} Cache key
+ */
+export const buildLlmCacheKey = (namespace, parts) =>
+  `${namespace}:${createHash('sha256').update(JSON.stringify(parts)).digest('hex')}`
+
+const storeEntry = (key, value) => {
+  const ttlMs = getTtlMs()
+  if (ttlMs === 0) return
+  entries.delete(key)
+  entries.set(key, { value: structuredClone(value), expiresAt: Date.now() + ttlMs })
+  const maxEntries = getMaxEntries()
+  while (entries.size > maxEntries) {
+    entries.delete(entries.keys().next().value)
+  }
+}
+
+/**
+ * Read a cached value (undefined on miss, expiry or when caching is disabled)
+ * @param {string} key - Cache key from buildLlmCacheKey
+ * @returns {any}
+ */
+export const getCachedLlmResult = key => {
+  if (!isCacheEnabled()) return undefined
+  const entry = entries.get(key)
+  if (!entry) return undefined
+  if (entry.expiresAt > Date.now()) return structuredClone(entry.value)
+  entries.delete(key)
+  return undefined
+}
+
+/**
+ * Store a value produced outside getOrCallLlm (e.g. an accumulated stream)
+ * @param {string} key - Cache key from buildLlmCacheKey
+ * @param {any} value - Value to cache
+ */
+export const setCachedLlmResult = (key, value) => {
+  if (!isCacheEnabled()) return
+  storeEntry(key, value)
+}
+
+/**
+ * Return the cached value for key, or run factory and cache its result
+ * Rejections are not cached, nor are results rejected by isCacheable. With bypass
+ * (user-requested regeneration) the cached and in-flight values are ignored and the
+ * fresh result replaces the entry.
+ * @param {string} key - Cache key from buildLlmCacheKey
+ * @param {Function} factory - Async function producing the value
+ * @param {object} [options] - { bypass, isCacheable }
+ * @returns {Promise<any>}
+ */
+export const getOrCallLlm = async (key, factory, { bypass = false, isCacheable } = {}) => {
+  if (!isCacheEnabled()) return factory()
+
+  const store = value => {
+    if (!isCacheable || isCacheable(value)) storeEntry(key, value)
+  }
+
+  if (bypass) {
+    const value = await factory()
+    store(value)
+    return value
+  }
+
+  const cached = getCachedLlmResult(key)
+  if (cached !== undefined) return cached
+
+  const inFlight = pending.get(key)
+  if (inFlight) return inFlight.then(structuredClone)
+
+  const promise = (async () => {
+    try {
+      const value = await factory()
+      store(value)
+      return value
+    } finally {
+      pending.delete(key)
+    }
+  })()
+  pending.set(key, promise)
+  return promise
+}
+
+/**
+ * Convenience wrapper: cache factory() under namespace + parts
+ */
+export const withLlmCache = (namespace, parts, factory, options) =>
+  getOrCallLlm(buildLlmCacheKey(namespace, parts), factory, options)
@@ -3,6 +3,9 @@
 
 import { MultiServerMCPClient } from '@langchain/mcp-adapters'
 
+// Tool argument/response dumps are only serialized when DEBUG_TOOLS=1
+const debugTools = () => process.env.DEBUG_TOOLS === '1'
+
 /**
  * MCP Tool Manager
  * Handles loading, caching, and managing MCP tools from ModelScope servers
@@ -12,6 +15,9 @@ class MCPToolManager {
     // Store MCP tool definitions by ID
     this.mcpTools = new Map()
 
+    // Index of tool IDs by MCP server name
+    this.toolIdsByServer = new Map()
+
     // Store loaded MCP servers
     this.loadedServers = new Set()
 
@@ -196,10 +202,12 @@ class MCPToolManager {
         throw new Error(`No connection found: ${name}`)
       }
 
-      console.log(
-        `[MCP Manager] Calling tool ${toolName} with args:`,
-        JSON.stringify(args, null, 2),
-      )
+      if (debugTools()) {
+        console.log(
+          `[MCP Manager] Calling tool ${toolName} with args:`,
+          JSON.stringify(args, null, 2),
+        )
+      }
 
       let response = null
       if (typeof connection.client.callTool === 'function') {
@@ -226,10 +234,12 @@ class MCPToolManager {
       const normalizedResponse = this.normalizeToolResult(response)
 
       // Log the response for debugging
-      console.log(
-        `[MCP Manager] Tool ${toolName} response:`,
-        JSON.stringify(normalizedResponse, null, 2),
-      )
+      if (debugTools()) {
+        console.log(
+          `[MCP Manager] Tool ${toolName} response:`,
+          JSON.stringify(normalizedResponse, null, 2),
+        )
+      }
 
       if (normalizedResponse.isError) {
         console.error(`[MCP Manager] ??Tool ${toolName} returned error:`, normalizedResponse)
@@ -267,7 +277,7 @@ class MCPToolManager {
 
       // Store tools
       for (const tool of qurioTools) {
-        this.mcpTools.set(tool.id, tool)
+        this.registerMcpTool(tool)
       }
 
       // Mark server as loaded
@@ -329,6 +339,26 @@ class MCPToolManager {
     }
   }
 
+  /**
+   * Register a Qurio-formatted MCP tool and index it by server
+   * @param {object} tool - Tool definition with config.mcpServer
+   */
+  registerMcpTool(tool) {
+    const serverName = tool.config?.mcpServer
+    const previous = this.mcpTools.get(tool.id)
+    const previousServer = previous?.config?.mcpServer
+    if (previous && previousServer !== serverName) {
+      this.toolIdsByServer.get(previousServer)?.delete(tool.id)
+    }
+    this.mcpTools.set(tool.id, tool)
+    let toolIds = this.toolIdsByServer.get(serverName)
+    if (!toolIds) {
+      toolIds = new Set()
+      this.toolIdsByServer.set(serverName, toolIds)
+    }
+    toolIds.add(tool.id)
+  }
+
   /**
    * Get MCP tool by ID
    * @param {string} toolId - Tool ID
@@ -352,7 +382,9 @@ class MCPToolManager {
    * @returns {Array} Array of tools from the server
    */
   listMcpToolsByServer(serverName) {
-    return this.listMcpTools().filter(tool => tool.config.mcpServer === serverName)
+    const toolIds = this.toolIdsByServer.get(serverName)
+    if (!toolIds) return []
+    return Array.from(toolIds, toolId => this.mcpTools.get(toolId))
   }
 
   /**
@@ -383,9 +415,12 @@ class MCPToolManager {
     console.log(`[MCP Manager] Unloading MCP server: ${name}`)
 
     // Remove tools from this server
-    const toolsToRemove = this.listMcpToolsByServer(name)
-    for (const tool of toolsToRemove) {
-      this.mcpTools.delete(tool.id)
+    const toolIds = this.toolIdsByServer.get(name)
+    if (toolIds) {
+      for (const toolId of toolIds) {
+        this.mcpTools.delete(toolId)
+      }
+      this.toolIdsByServer.delete(name)
     }
 
     // Disconnect from server
@@ -5,6 +5,9 @@
 
 import { safeJsonParse, toLangChainMessages } from '../serviceUtils.js'
 
+const THINK_BLOCK_REGEX = /<think>(.*?)<\/think>/s
+const THOUGHT_BLOCK_REGEX = /<thought>(.*?)<\/thought>/s
+
 export class BaseProviderAdapter {
   constructor(providerName) {
     this.providerName = providerName
@@ -134,10 +137,10 @@ export class BaseProviderAdapter {
       null
 
     // Fallback: Check content for <think> tags if no dedicated reasoning field
-    if (!thought && typeof response?.content === 'string') {
+    // (literal probe first so tag-free content skips both regex passes)
+    if (!thought && typeof response?.content === 'string' && response.content.includes('<th')) {
       const match =
-        response.content.match(/<think>(.*?)<\/think>/s) ||
-        response.content.match(/<thought>(.*?)<\/thought>/s)
+        THINK_BLOCK_REGEX.exec(response.content) || THOUGHT_BLOCK_REGEX.exec(response.content)
       if (match) {
         // Found thought in content
         // We usually don't want to mutate content here as it might break things,
@@ -12,6 +12,20 @@ import { SiliconFlowAdapter } from './SiliconFlowAdapter.js'
 import { NvidiaNimAdapter } from './NvidiaNimAdapter.js'
 import { MinimaxAdapter } from './MinimaxAdapter.js'
 
+// Provider name -> adapter class
+const ADAPTER_CLASSES = new Map([
+  ['openai', OpenAIAdapter],
+  ['openai_compatibility', OpenAIAdapter],
+  ['siliconflow', SiliconFlowAdapter],
+  ['kimi', KimiAdapter],
+  ['glm', GLMAdapter],
+  ['modelscope', ModelScopeAdapter],
+  ['gemini', GeminiAdapter],
+  ['nvidia', NvidiaNimAdapter],
+  // MiniMax has its own dedicated adapter
+  ['minimax', MinimaxAdapter],
+])
+
 // Cache adapter instances for reuse
 const adapterCache = new Map()
 
@@ -22,48 +36,19 @@ const adapterCache = new Map()
  */
 export function getProviderAdapter(provider) {
   // Return cached instance if available
-  if (adapterCache.has(provider)) {
-    return adapterCache.get(provider)
-  }
-
-  // Create new adapter instance
-  let adapter
+  const cached = adapterCache.get(provider)
+  if (cached) return cached
 
-  switch (provider) {
-    case 'openai':
-    case 'openai_compatibility':
-      adapter = new OpenAIAdapter()
-      break
-    case 'siliconflow':
-      adapter = new SiliconFlowAdapter()
-      break
-    case 'kimi':
-      adapter = new KimiAdapter()
-      break
-    case 'glm':
-      adapter = new GLMAdapter()
-      break
-    case 'modelscope':
-      adapter = new ModelScopeAdapter()
-      break
-    case 'gemini':
-      adapter = new GeminiAdapter()
-      break
-    case 'nvidia':
-      adapter = new NvidiaNimAdapter()
-      break
-    case 'minimax':
-      // MiniMax has its own dedicated adapter
-      adapter = new MinimaxAdapter()
-      break
-    default:
-      // Fallback to OpenAI adapter for unknown providers
-      // (assumes OpenAI-compatible API)
-      console.warn(`Unknown provider: ${provider}, using OpenAI adapter as fallback`)
-      adapter = new OpenAIAdapter()
+  let AdapterClass = ADAPTER_CLASSES.get(provider)
+  if (!AdapterClass) {
+    // Fallback to OpenAI adapter for unknown providers
+    // (assumes OpenAI-compatible API)
+    console.warn(`Unknown provider: ${provider}, using OpenAI adapter as fallback`)
+    AdapterClass = OpenAIAdapter
   }
 
   // Cache for future use
+  const adapter = new AdapterClass()
   adapterCache.set(provider, adapter)
   return adapter
 }
@@ -74,15 +59,5 @@ export function getProviderAdapter(provider) {
  * @returns {boolean} Whether provider is supported
  */
 export function isProviderSupported(provider) {
-  return [
-    'openai',
-    'openai_compatibility',
-    'siliconflow',
-    'kimi',
-    'glm',
-    'modelscope',
-    'gemini',
-    'nvidia',
-    'minimax',
-  ].includes(provider)
+  return ADAPTER_CLASSES.has(provider)
 }
@@ -97,17 +97,25 @@ export const PROVIDER_CAPABILITIES = {
   },
 }
 
+const providerConfigCache = new Map()
+
 /**
  * Get provider configuration
  * @param {string} provider - Provider name
  * @returns {Object} Provider configuration
  */
 export function getProviderConfig(provider) {
-  return {
-    baseURL: PROVIDER_BASE_URLS[provider],
-    defaultModel: DEFAULT_MODELS[provider],
-    capabilities: PROVIDER_CAPABILITIES[provider] || {},
+  // Adapters read this through getters on every request; the tables are static
+  let config = providerConfigCache.get(provider)
+  if (!config) {
+    config = Object.freeze({
+      baseURL: PROVIDER_BASE_URLS[provider],
+      defaultModel: DEFAULT_MODELS[provider],
+      capabilities: PROVIDER_CAPABILITIES[provider] || {},
+    })
+    providerConfigCache.set(provider, config)
   }
+  return config
 }
 
 /**
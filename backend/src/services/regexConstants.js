@@ -1,2 +1,26 @@
-export const TIME_KEYWORDS_REGEX =
-  /今天|今年|现在|本周|本月|最近|刚刚|明天|昨天|上周|上个月|去年|today|current|now|this week|this month|recently|tomorrow|yesterday|last week|last month|last year/i
+// Matched as plain substrings against the lowercased message (see hasTimeKeyword)
+export const TIME_KEYWORDS = Object.freeze([
+  '今天',
+  '今年',
+  '现在',
+  '本周',
+  '本月',
+  '最近',
+  '刚刚',
+  '明天',
+  '昨天',
+  '上周',
+  '上个月',
+  '去年',
+  'today',
+  'current',
+  'now',
+  'this week',
+  'this month',
+  'recently',
+  'tomorrow',
+  'yesterday',
+  'last week',
+  'last month',
+  'last year',
+])
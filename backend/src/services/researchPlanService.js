@@ -2,458 +2,14 @@
  * Research Plan generation service
  */
 
-import { ChatGoogleGenerativeAI } from '@langchain/google-genai'
-import { ChatOpenAI } from '@langchain/openai'
-import {
-  normalizeGeminiMessages,
-  normalizeTextContent,
-  safeJsonParse,
-  toLangChainMessages,
-} from './serviceUtils.js'
+import { requestCompletion } from './completionService.js'
+import { JSON_RESPONSE_FORMAT, safeJsonParse, stripJsonFence } from './serviceUtils.js'
+import { normalizeCacheText, withLlmCache } from './llmCache.js'
 
-// Default base URLs
-const OPENAI_DEFAULT_BASE = 'https://api.openai.com/v1'
-const SILICONFLOW_BASE = 'https://api.siliconflow.cn/v1'
-const GLM_BASE = 'https://open.bigmodel.cn/api/paas/v4'
-const MODELSCOPE_BASE = 'https://api-inference.modelscope.cn/v1'
-const KIMI_BASE = 'https://api.moonshot.cn/v1'
-
-// Default models
-const DEFAULT_MODELS = {
-  gemini: 'gemini-2.0-flash-exp',
-  openai: 'gpt-4o-mini',
-  siliconflow: 'Qwen/Qwen2.5-7B-Instruct',
-  glm: 'glm-4-flash',
-  modelscope: 'AI-ModelScope/glm-4-9b-chat',
-  kimi: 'moonshot-v1-8k',
-}
-
-// ============================================================================
-// Model builders
-// ============================================================================
-
-const buildGeminiModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  tools,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-
-  return new ChatGoogleGenerativeAI({
-    apiKey,
-    model: model || DEFAULT_MODELS.gemini,
-    temperature,
-    topK: top_k,
-    ...(top_p !== undefined ? { topP: top_p } : {}),
-    streaming,
-  })
-}
-
-const buildSiliconFlowModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-
-  const modelKwargs = {}
-  modelKwargs.response_format = responseFormat || { type: 'text' }
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.siliconflow,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: SILICONFLOW_BASE },
-  })
-}
-
-const buildGLMModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-
-  const modelKwargs = {}
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  modelKwargs.thinking = { type: thinking?.type || 'disabled' }
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.glm,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: GLM_BASE },
-  })
-}
-
-const buildModelScopeModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-
-  const modelKwargs = {}
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  modelKwargs.thinking = { type: thinking?.type || 'disabled' }
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.modelscope,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: MODELSCOPE_BASE },
-  })
-}
-
-const buildKimiModel = ({
-  apiKey,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-
-  const modelKwargs = {}
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.kimi,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: KIMI_BASE },
-  })
-}
-
-const buildOpenAIModel = ({
-  provider,
-  apiKey,
-  baseUrl,
-  model,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  streaming,
-}) => {
-  if (!apiKey) throw new Error('Missing API key')
-
-  const resolvedBase = baseUrl || OPENAI_DEFAULT_BASE
-
-  const modelKwargs = {}
-  if (tools && tools.length > 0) modelKwargs.tools = tools
-  if (toolChoice) modelKwargs.tool_choice = toolChoice
-  if (responseFormat) modelKwargs.response_format = responseFormat
-  if (top_k !== undefined) modelKwargs.top_k = top_k
-  if (top_p !== undefined) modelKwargs.top_p = top_p
-  if (frequency_penalty !== undefined) modelKwargs.frequency_penalty = frequency_penalty
-  if (presence_penalty !== undefined) modelKwargs.presence_penalty = presence_penalty
-
-  return new ChatOpenAI({
-    apiKey,
-    modelName: model || DEFAULT_MODELS.openai,
-    temperature,
-    streaming,
-    modelKwargs,
-    configuration: { baseURL: resolvedBase },
-  })
-}
-
-// ============================================================================
-// Request functions
-// ============================================================================
-
-const requestGemini = async ({ apiKey, model, messages, temperature, top_k, top_p, signal }) => {
-  const modelInstance = buildGeminiModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    tools: [],
-    thinking: false,
-    streaming: false,
-  })
-
-  const orderedMessages = normalizeGeminiMessages(messages || [])
-  const langchainMessages = toLangChainMessages(orderedMessages)
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestSiliconFlow = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  signal,
-}) => {
-  const modelInstance = buildSiliconFlowModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    tools: [],
-    toolChoice,
-    responseFormat,
-    thinking,
-    streaming: false,
-  })
-
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestGLM = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  signal,
-}) => {
-  const modelInstance = buildGLMModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    tools: [],
-    toolChoice,
-    responseFormat,
-    thinking: {
-      type: 'disabled',
-    },
-    streaming: false,
-  })
-
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestModelScope = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  signal,
-}) => {
-  const modelInstance = buildModelScopeModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    tools: [],
-    toolChoice,
-    responseFormat,
-    thinking: {
-      type: 'disabled',
-    },
-    streaming: false,
-  })
-
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestKimi = async ({
-  apiKey,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  signal,
-}) => {
-  const modelInstance = buildKimiModel({
-    apiKey,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    tools: [],
-    toolChoice,
-    responseFormat,
-    thinking: undefined,
-    streaming: false,
-  })
-
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-const requestOpenAICompat = async ({
-  provider,
-  apiKey,
-  baseUrl,
-  model,
-  messages,
-  temperature,
-  top_k,
-  top_p,
-  frequency_penalty,
-  presence_penalty,
-  tools,
-  toolChoice,
-  responseFormat,
-  thinking,
-  signal,
-}) => {
-  const modelInstance = buildOpenAIModel({
-    provider,
-    apiKey,
-    baseUrl,
-    model,
-    temperature,
-    top_k,
-    top_p,
-    frequency_penalty,
-    presence_penalty,
-    tools: [],
-    toolChoice,
-    responseFormat,
-    thinking,
-    streaming: false,
-  })
-
-  const langchainMessages = toLangChainMessages(messages || [])
-  const response = await modelInstance.invoke(langchainMessages, { signal })
-
-  return typeof response.content === 'string'
-    ? response.content
-    : normalizeTextContent(response.content)
-}
-
-export const buildResearchPlanMessages = userMessage => [
-  {
-    role: 'system',
-    content: `You are a task planner. Produce a detailed, execution-ready research plan in structured JSON.
+// Shared by every request so the planner prefix is byte-identical (provider prompt caching)
+const RESEARCH_PLAN_SYSTEM_MESSAGE = Object.freeze({
+  role: 'system',
+  content: `You are a task planner. Produce a detailed, execution-ready research plan in structured JSON.
 
 ## Input
 User message contains:
@@ -636,66 +192,88 @@ Return ONLY valid JSON, no markdown, no commentary:
   "risks": ["potential issues to avoid"],
   "success_criteria": ["how to tell if research succeeded"]
   }`,
-  },
+})
+
+export const buildResearchPlanMessages = userMessage => [
+  RESEARCH_PLAN_SYSTEM_MESSAGE,
   { role: 'user', content: userMessage },
 ]
 
-/**
- * Generate a structured deep research plan using a lightweight model
- */
-export const generateResearchPlan = async (provider, userMessage, apiKey, baseUrl, model) => {
-  const promptMessages = buildResearchPlanMessages(userMessage)
-
-  const responseFormat = provider !== 'gemini' ? { type: 'json_object' } : undefined
-  let content = undefined
-  if (provider === 'gemini') {
-    content = await requestGemini({ apiKey, model, messages: promptMessages })
-  } else if (provider === 'siliconflow') {
-    content = await requestSiliconFlow({
-      apiKey,
-      model,
-      messages: promptMessages,
-      responseFormat,
-    })
-  } else if (provider === 'glm') {
-    content = await requestGLM({
-      apiKey,
-      model,
-      messages: promptMessages,
-      responseFormat,
-    })
-  } else if (provider === 'modelscope') {
-    content = await requestModelScope({
-      apiKey,
-      model,
-      messages: promptMessages,
-      responseFormat,
-    })
-  } else if (provider === 'kimi') {
-    content = await requestKimi({
-      apiKey,
-      model,
-      messages: promptMessages,
-      responseFormat,
-    })
-  } else {
-    content = await requestOpenAICompat({
-      provider,
-      apiKey,
-      baseUrl,
-      model,
-      messages: promptMessages,
-      responseFormat,
-    })
+// Clean JSON (the usual case with json_object output) is returned untouched;
+// only text that needed fence stripping or extraction is re-serialized.
+const formatPlanContent = content => {
+  if (typeof content !== 'string') return ''
+  const text = stripJsonFence(content)
+  try {
+    JSON.parse(text)
+    return text
+  } catch {
+    const parsed = safeJsonParse(content)
+    return parsed ? JSON.stringify(parsed, null, 2) : text
   }
+}
 
-  const parsed = safeJsonParse(content)
-  if (parsed) {
-    try {
-      return JSON.stringify(parsed, null, 2)
-    } catch {
-      return content?.trim?.() || ''
-    }
+/**
+ * Check that planner output is a complete JSON plan
+ * Truncated, malformed or empty output is never cached, so a retry asks the model again.
+ * @param {string} content - Plan text
+ * @returns {boolean}
+ */
+export const isCompletePlan = content => {
+  if (typeof content !== 'string' || !content) return false
+  try {
+    JSON.parse(stripJsonFence(content))
+    return true
+  } catch {
+    return false
   }
-  return content?.trim?.() || ''
 }
+
+/**
+ * Run a planner prompt and return the normalized plan JSON string
+ * Shared by the general and academic planners; complete plans are cached per kind.
+ * @param {string} kind - Planner kind ('general' | 'academic')
+ * @param {Function} buildMessages - Prompt builder for the planner
+ * @param {object} request - { provider, userMessage, apiKey, baseUrl, model }
+ * @returns {Promise<string>} Plan JSON string
+ */
+export const runResearchPlanner = (
+  kind,
+  buildMessages,
+  { provider, userMessage, apiKey, baseUrl, model },
+) =>
+  withLlmCache(
+    `research-plan:${kind}`,
+    [provider, baseUrl, model, apiKey, normalizeCacheText(userMessage)],
+    async () => {
+      const responseFormat = provider !== 'gemini' ? JSON_RESPONSE_FORMAT : undefined
+      const content = await requestCompletion(provider, {
+        apiKey,
+        baseUrl,
+        model,
+        messages: buildMessages(userMessage),
+        responseFormat,
+      })
+      // json_object output is already a JSON document; callers parse the plan themselves.
+      // Providers that ignore the format still go through extraction.
+      if (responseFormat && typeof content === 'string') {
+        const text = content.trim()
+        if (text.startsWith('{')) return text
+      }
+      return formatPlanContent(content)
+    },
+    { isCacheable: isCompletePlan },
+  )
+
+/**
+ * Generate a structured deep research plan using a lightweight model
+ * Repeated questions within the cache TTL reuse the previous plan.
+ */
+export const generateResearchPlan = (provider, userMessage, apiKey, baseUrl, model) =>
+  runResearchPlanner('general', buildResearchPlanMessages, {
+    provider,
+    userMessage,
+    apiKey,
+    baseUrl,
+    model,
+  })
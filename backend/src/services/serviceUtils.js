@@ -1,12 +1,82 @@
 import { AIMessage, HumanMessage, SystemMessage, ToolMessage } from '@langchain/core/messages'
 
+// Shared by every JSON-mode helper request; never mutated.
+export const JSON_RESPONSE_FORMAT = Object.freeze({ type: 'json_object' })
+
+const JSON_BLOCK_REGEX = /\{[\s\S]*\}|\[[\s\S]*\]/
+const JSON_START_REGEX = /[{[]/
+const JSON_FENCE_REGEX = /^\s*```(?:json)?[^\S\n]*\n?([\s\S]*?)\n?\s*```\s*$/i
+
+/**
+ * Strip a surrounding markdown code fence (```json ... ```) from model output.
+ * Returns the trimmed text unchanged when it is not fenced.
+ */
+export const stripJsonFence = text => {
+  const match = JSON_FENCE_REGEX.exec(text)
+  return (match ? match[1] : text).trim()
+}
+
+/**
+ * Return the first balanced JSON object/array embedded in text, or null.
+ * Single left-to-right scan that tracks string/escape state so braces inside
+ * string values do not affect the depth.
+ */
+export const extractFirstJsonValue = text => {
+  let start = -1
+  let depth = 0
+  let inString = false
+  let escaped = false
+  for (let i = 0; i < text.length; i += 1) {
+    const ch = text[i]
+    if (start === -1) {
+      if (ch === '{' || ch === '[') {
+        start = i
+        depth = 1
+      }
+      continue
+    }
+    if (inString) {
+      if (escaped) escaped = false
+      else if (ch === '\\') escaped = true
+      else if (ch === '"') inString = false
+      continue
+    }
+    if (ch === '"') inString = true
+    else if (ch === '{' || ch === '[') depth += 1
+    else if (ch === '}' || ch === ']') {
+      depth -= 1
+      if (depth === 0) return text.slice(start, i + 1)
+    }
+  }
+  return null
+}
+
 export const safeJsonParse = text => {
   if (!text || typeof text !== 'string') return null
   try {
     return JSON.parse(text)
   } catch {
-    const match = text.match(/\{[\s\S]*\}|\[[\s\S]*\]/)
-    if (!match) return null
+    // Plain-text payloads (typical tool output) have no object/array to recover,
+    // so skip the fence/scan fallbacks entirely.
+    if (!JSON_START_REGEX.test(text)) return null
+    const unfenced = stripJsonFence(text)
+    if (unfenced !== text.trim()) {
+      try {
+        return JSON.parse(unfenced)
+      } catch {
+        // Fall through to the bracket scan below
+      }
+    }
+    const candidate = extractFirstJsonValue(text)
+    if (candidate) {
+      try {
+        return JSON.parse(candidate)
+      } catch {
+        // Fall through to the greedy match below
+      }
+    }
+    const match = text.match(JSON_BLOCK_REGEX)
+    if (!match || match[0] === candidate) return null
     try {
       return JSON.parse(match[0])
     } catch {
@@ -15,18 +85,67 @@ export const safeJsonParse = text => {
   }
 }
 
+/**
+ * Whole milliseconds elapsed since a performance.now() reading.
+ * Monotonic, so tool durations are unaffected by wall-clock adjustments.
+ */
+export const elapsedMs = startedAt => Math.round(performance.now() - startedAt)
+
+const OPTION_BRACES_REGEX = /[{}]/g
+const OPTION_WHITESPACE_REGEX = /\s+/g
+
+/**
+ * Flatten a space/agent label into a single-line option token.
+ * Braces are stripped because they delimit agent lists in the prompt.
+ */
+export const sanitizeOptionText = text =>
+  String(text || '')
+    .replace(OPTION_BRACES_REGEX, '')
+    .replace(OPTION_WHITESPACE_REGEX, ' ')
+    .trim()
+
+/**
+ * Format agents (plain names or { name, description }) as prompt option tokens
+ * in one pass; agents without a usable name are skipped.
+ */
+export const buildAgentTokens = agents => {
+  const tokens = []
+  for (const agent of agents || []) {
+    let name = ''
+    let description = ''
+    if (typeof agent === 'string') {
+      name = sanitizeOptionText(agent)
+    } else if (typeof agent?.name === 'string') {
+      name = sanitizeOptionText(agent.name)
+      description = name ? sanitizeOptionText(agent.description) : ''
+    }
+    if (!name) continue
+    tokens.push(description ? `${name} - ${description}` : name)
+  }
+  return tokens
+}
+
+/**
+ * Return the first non-empty emoji from a model-provided list as a one-item array
+ */
+export const pickFirstEmoji = emojis => {
+  if (!Array.isArray(emojis)) return []
+  for (const item of emojis) {
+    const emoji = String(item || '').trim()
+    if (emoji) return [emoji]
+  }
+  return []
+}
+
 export const normalizeTextContent = content => {
   if (typeof content === 'string') return content
   if (Array.isArray(content)) {
-    return content
-      .map(part => {
-        if (typeof part === 'string') return part
-        if (part?.type === 'text' && part.text) return part.text
-        if (part?.text) return part.text
-        return ''
-      })
-      .filter(Boolean)
-      .join('\n')
+    const parts = []
+    for (const part of content) {
+      const text = typeof part === 'string' ? part : part?.text
+      if (text) parts.push(text)
+    }
+    return parts.join('\n')
   }
   return content ? String(content) : ''
 }
@@ -4,29 +4,133 @@
  */
 
 import { getProviderAdapter } from './providers/adapterFactory.js'
-import { normalizeTextContent, safeJsonParse } from './serviceUtils.js'
-import { TIME_KEYWORDS_REGEX } from './regexConstants.js'
-import { executeToolByName, getToolDefinitionsByIds, isLocalToolName } from './toolsService.js'
+import { elapsedMs, normalizeTextContent, safeJsonParse } from './serviceUtils.js'
+import { TIME_KEYWORDS } from './regexConstants.js'
+import {
+  executeToolByName,
+  getDefaultTimeZone,
+  getToolDefinitionsByIds,
+  isLocalToolName,
+} from './toolsService.js'
 import { executeCustomTool } from './customToolExecutor.js'
+import { mcpToolManager } from './mcpToolManager.js'
 
 // Debug flags
 const debugStream = () => process.env.DEBUG_STREAM === '1'
 const debugSources = () => process.env.DEBUG_SOURCES === '1'
+const debugTools = () => process.env.DEBUG_TOOLS === '1'
+
+// Buffered provider streams can resolve many chunks as microtasks back to back;
+// every STREAM_YIELD_INTERVAL chunks we give timers and socket I/O a macrotask turn.
+const STREAM_YIELD_INTERVAL = 64
+const yieldToEventLoop = () => new Promise(resolve => setImmediate(resolve))
 
 /**
  * Apply context limit to messages
  */
 const applyContextLimit = (messages, limit) => {
   if (!limit || limit <= 0 || !messages || messages.length <= limit) return messages
-  const systemMessages = messages.filter(m => m?.role === 'system')
-  const nonSystemMessages = messages.filter(m => m?.role !== 'system')
-  const recent = nonSystemMessages.slice(-limit)
-  return [...systemMessages, ...recent]
+  // Single backwards pass: keep every system message and the last `limit` others
+  const systemMessages = []
+  const recent = []
+  for (let i = messages.length - 1; i >= 0; i -= 1) {
+    const message = messages[i]
+    if (message?.role === 'system') {
+      systemMessages.push(message)
+    } else if (recent.length < limit) {
+      recent.push(message)
+    }
+  }
+  // Nothing dropped (the extra length was all system messages): keep the original array
+  if (systemMessages.length + recent.length === messages.length) return messages
+  return systemMessages.reverse().concat(recent.reverse())
 }
 
+// Appended to the system prompt when interactive_form is available
+const FORM_GUIDANCE = `
+[TOOL USE GUIDANCE]
+When you need to collect structured information from the user (e.g. preferences, requirements, booking details), use the 'interactive_form' tool.
+CRITICAL: DO NOT list questions in text or markdown. YOU MUST USE the 'interactive_form' tool to display fields.
+Keep forms concise (3-6 fields).
+
+[MANDATORY TEXT-FIRST RULE]
+CRITICAL: You MUST output meaningful introductory text BEFORE calling 'interactive_form'.
+- NEVER call 'interactive_form' as the very first thing in your response
+- ALWAYS explain the context, acknowledge the user's request, or provide guidance BEFORE the form
+- Minimum: Output at least 1-2 sentences before the form call
+- Example: "I can help you with that. To provide the best recommendation, please share some details below:"
+
+[SINGLE FORM PER RESPONSE]
+CRITICAL: You may call 'interactive_form' ONLY ONCE per response. Do NOT call it multiple times in the same answer.
+If you need to collect information, design ONE comprehensive form that gathers all necessary details at once.
+
+[MULTI-TURN INTERACTIONS]
+1. If the information from a submitted form is insufficient, you MAY present another 'interactive_form' in your NEXT response (after the user submits the first form).
+2. LIMIT: Use at most 2-3 forms total across the entire conversation. Excessive questioning frustrates users.
+3. INTERLEAVING: You can place the form anywhere in your response. Output introductory text FIRST (e.g., "I can help with that. Please provide some details below:"), then call 'interactive_form' once.
+4. If the user has provided enough context through previous forms, proceed directly to the final answer without requesting more information.`
+
+// Appended to the system prompt when a web search tool is available
+const CITATION_PROMPT =
+  '\n\n[IMPORTANT] You have access to a "Tavily_web_search" tool. When you use this tool to answer a question, you MUST cite the search results in your answer using the format [1], [2], etc., corresponding to the index of the search result provided in the tool output. Do not fabricate citations.'
+
+// Tool name -> guidance bit, OR-ed together while tools are deduplicated
+const FORM_GUIDANCE_FLAG = 1
+const CITATION_GUIDANCE_FLAG = 2
+const GUIDANCE_FLAGS_BY_TOOL = new Map([
+  ['interactive_form', FORM_GUIDANCE_FLAG],
+  ['Tavily_web_search', CITATION_GUIDANCE_FLAG],
+  ['web_search', CITATION_GUIDANCE_FLAG],
+])
+
+// First character -> keywords starting with it (a one-level trie over TIME_KEYWORDS)
+const TIME_KEYWORDS_BY_FIRST_CHAR = TIME_KEYWORDS.reduce((index, keyword) => {
+  const bucket = index.get(keyword[0])
+  if (bucket) bucket.push(keyword)
+  else index.set(keyword[0], [keyword])
+  return index
+}, new Map())
+
 /**
- * Factory for handleTaggedText function
+ * Whether text mentions a relative time ("today", "最近", ...)
+ * Single pass over the lowercased text: only keywords sharing the current
+ * character are compared, so the cost does not grow with the keyword count.
+ */
+const hasTimeKeyword = text => {
+  const lowered = text.toLowerCase()
+  for (let i = 0; i < lowered.length; i += 1) {
+    const candidates = TIME_KEYWORDS_BY_FIRST_CHAR.get(lowered[i])
+    if (!candidates) continue
+    for (const keyword of candidates) {
+      if (lowered.startsWith(keyword, i)) return true
+    }
+  }
+  return false
+}
+
+// Thought delimiters in streamed text, matched case-insensitively
+const THOUGHT_OPEN_TAGS = ['<think>', '<thought>']
+const THOUGHT_CLOSE_TAGS = ['</think>', '</thought>']
+const MAX_THOUGHT_TAG_LENGTH = 10
+
+/**
+ * Find the first of tags in text at or after from
+ * Jumps between '<' characters with indexOf and only lowercases the few
+ * characters after each one, so tag-free chunks cost a single scan.
+ * @returns {{ index: number, length: number } | null}
  */
+const findThoughtTag = (text, from, tags) => {
+  let index = text.indexOf('<', from)
+  while (index !== -1) {
+    const candidate = text.slice(index, index + MAX_THOUGHT_TAG_LENGTH).toLowerCase()
+    for (const tag of tags) {
+      if (candidate.startsWith(tag)) return { index, length: tag.length }
+    }
+    index = text.indexOf('<', index + 1)
+  }
+  return null
+}
+
 /**
  * Factory for handleTaggedText function
  */
@@ -38,42 +142,29 @@ const handleTaggedTextFactory = ({ emitText, emitThought, enableTags = true }) =
       emitText(text)
       return
     }
+    if (!text) return
+    // Most deltas contain no '<' at all: emit them without entering the scanner
+    if (!text.includes('<')) {
+      if (inThoughtBlock) emitThought(text)
+      else emitText(text)
+      return
+    }
 
-    let remaining = text
-    while (remaining) {
-      if (!inThoughtBlock) {
-        const matchIndex = remaining.search(/<think>|<thought>/i)
-        if (matchIndex === -1) {
-          emitText(remaining)
-          return
-        }
-        emitText(remaining.slice(0, matchIndex))
-        remaining = remaining.slice(matchIndex)
-        const openMatch = remaining.match(/^<(think|thought)>/i)
-        if (openMatch) {
-          remaining = remaining.slice(openMatch[0].length)
-          inThoughtBlock = true
-        } else {
-          emitText(remaining)
-          return
-        }
-      } else {
-        const matchIndex = remaining.search(/<\/think>|<\/thought>/i)
-        if (matchIndex === -1) {
-          emitThought(remaining)
-          return
-        }
-        emitThought(remaining.slice(0, matchIndex))
-        remaining = remaining.slice(matchIndex)
-        const closeMatch = remaining.match(/^<\/(think|thought)>/i)
-        if (closeMatch) {
-          remaining = remaining.slice(closeMatch[0].length)
-          inThoughtBlock = false
-        } else {
-          emitThought(remaining)
-          return
-        }
+    let position = 0
+    while (position < text.length) {
+      const emit = inThoughtBlock ? emitThought : emitText
+      const tag = findThoughtTag(
+        text,
+        position,
+        inThoughtBlock ? THOUGHT_CLOSE_TAGS : THOUGHT_OPEN_TAGS,
+      )
+      if (!tag) {
+        emit(position === 0 ? text : text.slice(position))
+        return
       }
+      emit(text.slice(position, tag.index))
+      position = tag.index + tag.length
+      inThoughtBlock = !inThoughtBlock
     }
   }
 }
@@ -101,6 +192,11 @@ const collectGLMSources = (webSearch, sourcesMap) => {
 }
 */
 
+// Search results can carry hundreds of hits and page-sized snippets; the UI
+// only shows the top few, so collection is bounded on both.
+const MAX_SOURCE_RESULTS = 50
+const SOURCE_SNIPPET_LIMIT = 200
+
 const collectKimiSources = (toolOutput, sourcesMap) => {
   if (!toolOutput) return
   const parsed = typeof toolOutput === 'string' ? safeJsonParse(toolOutput) : toolOutput
@@ -110,13 +206,17 @@ const collectKimiSources = (toolOutput, sourcesMap) => {
     parsed?.results || parsed?.data || parsed?.items || (Array.isArray(parsed) ? parsed : [])
   if (!Array.isArray(results)) return
 
-  for (const item of results) {
-    const url = item?.url || item?.link || item?.href
+  const count = Math.min(results.length, MAX_SOURCE_RESULTS)
+  for (let i = 0; i < count; i += 1) {
+    const item = results[i]
+    if (!item) continue
+    const url = item.url || item.link || item.href
     if (!url || sourcesMap.has(url)) continue
+    const snippet = item.snippet || item.description || item.content
     sourcesMap.set(url, {
-      title: item?.title || url,
+      title: item.title || url,
       uri: url,
-      snippet: item?.snippet || item?.description || item?.content?.substring(0, 200) || '',
+      snippet: typeof snippet === 'string' ? snippet.slice(0, SOURCE_SNIPPET_LIMIT) : '',
     })
   }
 }
@@ -125,24 +225,33 @@ const collectKimiSources = (toolOutput, sourcesMap) => {
  * Collect Tavily web search sources
  */
 const collectWebSearchSources = (result, sourcesMap) => {
-  if (!result?.results || !Array.isArray(result.results)) return
-  result.results.forEach(item => {
-    const url = item.url
-    if (url && !sourcesMap.has(url)) {
-      sourcesMap.set(url, {
-        title: item.title || 'Unknown Source',
-        uri: url,
-      })
-    }
-  })
+  const results = result?.results
+  if (!Array.isArray(results)) return
+  const count = Math.min(results.length, MAX_SOURCE_RESULTS)
+  for (let i = 0; i < count; i += 1) {
+    const item = results[i]
+    const url = item?.url
+    if (!url || sourcesMap.has(url)) continue
+    sourcesMap.set(url, {
+      title: item.title || 'Unknown Source',
+      uri: url,
+    })
+  }
 }
 
-const isSearchToolName = name =>
-  name === 'Tavily_web_search' ||
-  name === 'Tavily_academic_search' ||
-  name === 'web_search' ||
-  name === 'academic_search' ||
-  name === 'search' // Kimi native search tool
+// Search tool name -> source collector, resolved with one lookup per tool result
+const SOURCE_COLLECTORS_BY_TOOL = new Map([
+  ['Tavily_web_search', collectWebSearchSources],
+  ['Tavily_academic_search', collectWebSearchSources],
+  ['web_search', collectWebSearchSources],
+  ['academic_search', collectWebSearchSources],
+  ['search', collectKimiSources], // Kimi native search tool
+])
+
+const collectToolSources = (toolName, result, sourcesMap) => {
+  const collect = SOURCE_COLLECTORS_BY_TOOL.get(toolName)
+  if (collect) collect(result, sourcesMap)
+}
 
 // NOTE: Gemini grounding sources are not wired into the adapter path yet.
 // Keeping commented until adapter exposes groundingMetadata.
@@ -165,14 +274,11 @@ const collectGeminiSources = (groundingMetadata, geminiSources) => {
 /**
  * Build tool call event
  */
-const buildToolCallEvent = (toolCall, argsOverride) => ({
+const buildToolCallEvent = (toolCall, argumentsText) => ({
   type: 'tool_call',
   id: toolCall?.id || null,
   name: getToolCallName(toolCall),
-  arguments:
-    typeof argsOverride !== 'undefined'
-      ? formatToolArgumentsFromValue(argsOverride)
-      : formatToolArgumentsFromValue(getToolCallArguments(toolCall)),
+  arguments: argumentsText,
   textIndex: toolCall?.textIndex,
 })
 
@@ -217,13 +323,48 @@ const getToolCallArguments = toolCall =>
 const formatToolArgumentsFromValue = value => {
   if (!value) return ''
   if (typeof value === 'string') {
-    const parsed = safeJsonParse(value)
-    return parsed ? JSON.stringify(parsed) : value
+    // Well-formed argument strings are forwarded as-is; only ones wrapped in
+    // extra text are extracted and re-serialized
+    try {
+      JSON.parse(value)
+      return value
+    } catch {
+      const parsed = safeJsonParse(value)
+      return parsed ? JSON.stringify(parsed) : value
+    }
+  }
+  if (typeof value === 'object') {
+    if (value.constructor === Object && isEmptyObject(value)) return '{}'
+    return JSON.stringify(value)
   }
-  if (typeof value === 'object') return JSON.stringify(value)
   return String(value)
 }
 
+const isEmptyObject = value => {
+  for (const key in value) {
+    if (Object.hasOwn(value, key)) return false
+  }
+  return true
+}
+
+/**
+ * Helper: Parse tool call arguments once for both execution and the tool_call event
+ * Well-formed JSON strings (the usual case) are reused as the event text instead of
+ * being parsed again and re-serialized.
+ */
+const parseToolCallArguments = rawArgs => {
+  if (typeof rawArgs === 'string') {
+    try {
+      return { parsedArgs: JSON.parse(rawArgs), argumentsText: rawArgs }
+    } catch {
+      const parsedArgs = safeJsonParse(rawArgs)
+      return { parsedArgs, argumentsText: formatToolArgumentsFromValue(parsedArgs) }
+    }
+  }
+  const parsedArgs = rawArgs || {}
+  return { parsedArgs, argumentsText: formatToolArgumentsFromValue(parsedArgs) }
+}
+
 /**
  * Helper: Update tool calls map
  */
@@ -303,85 +444,111 @@ export const streamChat = async function* (params) {
 
   const toolConfig = { searchProvider, tavilyApiKey }
 
-  // Apply context limit
-  const trimmedMessages = applyContextLimit(messages, contextMessageLimit)
+  // Apply context limit, then take the single working copy of the history for this
+  // request. Local time, tool guidance and every tool round update it in place; the
+  // copy is only needed when the limit kept the caller's array as-is.
+  const limitedMessages = applyContextLimit(messages, contextMessageLimit)
+  const currentMessages = limitedMessages === messages ? [...messages] : limitedMessages
 
   const preExecutionEvents = []
 
-  // Check for time-related keywords in the last user message
-  const lastUserMessage = trimmedMessages
-    .slice()
-    .reverse()
-    .find(m => m.role === 'user')
-  const timeKeywordsRegex = TIME_KEYWORDS_REGEX
-
-  if (lastUserMessage?.content) {
-    const isTimeMatch = timeKeywordsRegex.test(lastUserMessage.content)
-    const isToolEnabled = Array.isArray(toolIds) && toolIds.includes('local_time')
-
-    if (isTimeMatch && isToolEnabled) {
-      try {
-        console.log('[TimeInject] Injecting local time context...')
-        const startedAt = Date.now()
-        // Prepare tool arguments with user's timezone and locale
-        const timeArgs = {
-          timezone: userTimezone || Intl.DateTimeFormat().resolvedOptions().timeZone,
-          locale: userLocale || 'en-US',
-        }
-        const timeResult = await executeToolByName('local_time', timeArgs, {})
-        const timeContext = `\n\n[SYSTEM INJECTED CONTEXT]\nCurrent Local Time: ${timeResult.formatted} (${timeResult.timezone})`
-
-        // Prepare UI events with the actual arguments
-        const pseudoToolCall = {
-          id: `local-time-${Date.now()}`,
-          function: { name: 'local_time', arguments: JSON.stringify(timeArgs) },
-          textIndex: 0,
-        }
-        preExecutionEvents.push(buildToolCallEvent(pseudoToolCall, timeArgs))
-        preExecutionEvents.push(
-          buildToolResultEvent(pseudoToolCall, null, Date.now() - startedAt, timeResult),
-        )
-
-        // Inject into the LAST USER message for better attention
-        const lastUserIndex = trimmedMessages
-          .map((m, i) => (m.role === 'user' ? i : -1))
-          .reduce((a, b) => Math.max(a, b), -1)
-
-        if (lastUserIndex !== -1) {
-          trimmedMessages[lastUserIndex] = {
-            ...trimmedMessages[lastUserIndex],
-            content: trimmedMessages[lastUserIndex].content + timeContext,
-          }
-        }
-      } catch (e) {
-        console.warn('Failed to inject local time context:', e)
+  // Check for time-related keywords in the last user message. The tool check
+  // comes first so requests without local_time skip the scan entirely.
+  const isLocalTimeEnabled = Array.isArray(toolIds) && toolIds.includes('local_time')
+  let lastUserIndex = -1
+  if (isLocalTimeEnabled) {
+    for (let i = currentMessages.length - 1; i >= 0; i -= 1) {
+      if (currentMessages[i]?.role === 'user') {
+        lastUserIndex = i
+        break
       }
     }
   }
+  const lastUserMessage = lastUserIndex !== -1 ? currentMessages[lastUserIndex] : null
 
-  // Inject interactive_form guidance if tool is available
-  // Inject interactive_form guidance (GLOBAL TOOL)
+  if (lastUserMessage?.content && hasTimeKeyword(normalizeTextContent(lastUserMessage.content))) {
+    try {
+      console.log('[TimeInject] Injecting local time context...')
+      const startedAt = performance.now()
+      // Prepare tool arguments with user's timezone and locale
+      const timeArgs = {
+        timezone: userTimezone || getDefaultTimeZone(),
+        locale: userLocale || 'en-US',
+      }
+      const timeResult = await executeToolByName('local_time', timeArgs, {})
+      const timeContext = `\n\n[SYSTEM INJECTED CONTEXT]\nCurrent Local Time: ${timeResult.formatted} (${timeResult.timezone})`
+
+      // UI events in the same shape as buildToolCallEvent/buildToolResultEvent; the
+      // name and status are fixed, so build them directly and stringify args once
+      const toolCallId = `local-time-${Date.now()}`
+      preExecutionEvents.push(
+        {
+          type: 'tool_call',
+          id: toolCallId,
+          name: 'local_time',
+          arguments: JSON.stringify(timeArgs),
+          textIndex: 0,
+        },
+        {
+          type: 'tool_result',
+          id: toolCallId,
+          name: 'local_time',
+          status: 'done',
+          duration_ms: elapsedMs(startedAt),
+          output: timeResult,
+        },
+      )
 
-  let currentMessages = trimmedMessages
+      // Inject into the LAST USER message for better attention; multimodal
+      // content gets an extra text part instead of being stringified
+      const { content } = lastUserMessage
+      currentMessages[lastUserIndex] = {
+        ...lastUserMessage,
+        content: Array.isArray(content)
+          ? [...content, { type: 'text', text: timeContext }]
+          : content + timeContext,
+      }
+    } catch (e) {
+      console.warn('Failed to inject local time context:', e)
+    }
+  }
 
   // Get provider adapter
   const adapter = getProviderAdapter(provider)
 
-  // Load user-defined custom tools from params
-  let userTools = params.userTools || []
-  let userToolsMap = new Map()
-  if (Array.isArray(userTools)) {
-    userTools.forEach(tool => {
-      userToolsMap.set(tool.name, tool)
+  // Load user-defined custom tools (HTTP + MCP) from params in one pass: the lookup
+  // map used for execution, the definitions sent to the model and the MCP subset
+  const userTools = Array.isArray(params.userTools) ? params.userTools : []
+  const userToolsMap = new Map()
+  const userToolDefinitions = []
+  const mcpTools = []
+  for (const tool of userTools) {
+    userToolsMap.set(tool.name, tool)
+    const isMcpTool = tool.type === 'mcp'
+    if (isMcpTool) mcpTools.push(tool)
+    const parameters = isMcpTool ? tool.parameters || tool.input_schema : tool.input_schema
+
+    // Debug log for MCP tool parameters
+    if (isMcpTool && debugTools()) {
+      console.log(
+        `[streamChat] MCP Tool "${tool.name}" parameters:`,
+        JSON.stringify(parameters, null, 2),
+      )
+    }
+
+    userToolDefinitions.push({
+      type: 'function',
+      function: {
+        name: tool.name,
+        description: tool.description,
+        parameters,
+      },
     })
   }
 
   // Dynamically load MCP servers if MCP tools are present
-  const mcpTools = userTools.filter(tool => tool.type === 'mcp')
   if (mcpTools.length > 0) {
     try {
-      const { mcpToolManager } = await import('./mcpToolManager.js')
-
       // Group by server to avoid loading the same server multiple times
       const serversToLoad = new Map()
       for (const tool of mcpTools) {
@@ -399,8 +566,7 @@ export const streamChat = async function* (params) {
         }
 
         // Check if server is already loaded
-        const status = mcpToolManager.getStatus()
-        if (!status.loadedServers.includes(serverName)) {
+        if (!mcpToolManager.loadedServers.has(serverName)) {
           if (!serversToLoad.has(serverName)) {
             serversToLoad.set(serverName, {
               url: serverUrl,
@@ -415,7 +581,7 @@ export const streamChat = async function* (params) {
         // Use the actual tool ID from Supabase (e.g., UUID) instead of generating a new one
         const toolId = tool.id || tool.name
         if (!mcpToolManager.getMcpTool(toolId)) {
-          mcpToolManager.mcpTools.set(toolId, {
+          mcpToolManager.registerMcpTool({
             id: toolId,
             name: tool.name,
             type: 'mcp',
@@ -430,39 +596,24 @@ export const streamChat = async function* (params) {
         }
       }
 
-      // Load servers that are not already loaded
-      for (const [serverName, serverConfig] of serversToLoad.entries()) {
-        console.log(`[streamChat] Loading MCP server: ${serverName}`)
-        await mcpToolManager.loadMcpServer(serverName, serverConfig)
-      }
+      // Load servers that are not already loaded; connections are independent,
+      // so overlap them and let one failing server not block the others
+      const loadResults = await Promise.allSettled(
+        Array.from(serversToLoad.entries(), ([serverName, serverConfig]) => {
+          console.log(`[streamChat] Loading MCP server: ${serverName}`)
+          return mcpToolManager.loadMcpServer(serverName, serverConfig)
+        }),
+      )
+      loadResults.forEach(result => {
+        if (result.status === 'rejected') {
+          console.error('[streamChat] Failed to load MCP server:', result.reason?.message)
+        }
+      })
     } catch (error) {
       console.error('[streamChat] Failed to load MCP servers:', error.message)
     }
   }
 
-  // Convert all user tools (HTTP + MCP) to tool definitions
-  const userToolDefinitions = userTools.map(tool => {
-    const parameters =
-      tool.type === 'mcp' ? tool.parameters || tool.input_schema : tool.input_schema
-
-    // Debug log for MCP tool parameters
-    if (tool.type === 'mcp') {
-      console.log(
-        `[streamChat] MCP Tool "${tool.name}" parameters:`,
-        JSON.stringify(parameters, null, 2),
-      )
-    }
-
-    return {
-      type: 'function',
-      function: {
-        name: tool.name,
-        description: tool.description,
-        parameters,
-      },
-    }
-  })
-
   // Prepare tool definitions
   // Always include interactive_form as it is a global tool
   const agentToolDefinitions = provider === 'gemini' ? [] : getToolDefinitionsByIds(toolIds)
@@ -475,63 +626,30 @@ export const streamChat = async function* (params) {
   // Deduplicate tools by name
   const normalizedTools = []
   const toolNames = new Set()
+  let guidanceFlags = 0
   for (const tool of combinedTools) {
     const name = tool?.function?.name
-    if (name && toolNames.has(name)) continue
-    if (name) toolNames.add(name)
+    if (name) {
+      if (toolNames.has(name)) continue
+      toolNames.add(name)
+      guidanceFlags |= GUIDANCE_FLAGS_BY_TOOL.get(name) ?? 0
+    }
     normalizedTools.push(tool)
   }
 
-  // Inject interactive_form guidance if tool is available
-  if (normalizedTools.some(t => t.function?.name === 'interactive_form')) {
-    const formGuidance = `
-[TOOL USE GUIDANCE]
-When you need to collect structured information from the user (e.g. preferences, requirements, booking details), use the 'interactive_form' tool.
-CRITICAL: DO NOT list questions in text or markdown. YOU MUST USE the 'interactive_form' tool to display fields.
-Keep forms concise (3-6 fields).
-
-[MANDATORY TEXT-FIRST RULE]
-CRITICAL: You MUST output meaningful introductory text BEFORE calling 'interactive_form'.
-- NEVER call 'interactive_form' as the very first thing in your response
-- ALWAYS explain the context, acknowledge the user's request, or provide guidance BEFORE the form
-- Minimum: Output at least 1-2 sentences before the form call
-- Example: "I can help you with that. To provide the best recommendation, please share some details below:"
-
-[SINGLE FORM PER RESPONSE]
-CRITICAL: You may call 'interactive_form' ONLY ONCE per response. Do NOT call it multiple times in the same answer.
-If you need to collect information, design ONE comprehensive form that gathers all necessary details at once.
-
-[MULTI-TURN INTERACTIONS]
-1. If the information from a submitted form is insufficient, you MAY present another 'interactive_form' in your NEXT response (after the user submits the first form).
-2. LIMIT: Use at most 2-3 forms total across the entire conversation. Excessive questioning frustrates users.
-3. INTERLEAVING: You can place the form anywhere in your response. Output introductory text FIRST (e.g., "I can help with that. Please provide some details below:"), then call 'interactive_form' once.
-4. If the user has provided enough context through previous forms, proceed directly to the final answer without requesting more information.`
-
+  // Append tool guidance to the system message (created if missing)
+  if (guidanceFlags !== 0) {
+    const guidance =
+      (guidanceFlags & FORM_GUIDANCE_FLAG ? FORM_GUIDANCE : '') +
+      (guidanceFlags & CITATION_GUIDANCE_FLAG ? CITATION_PROMPT : '')
     const systemIndex = currentMessages.findIndex(m => m.role === 'system')
     if (systemIndex !== -1) {
       currentMessages[systemIndex] = {
         ...currentMessages[systemIndex],
-        content: currentMessages[systemIndex].content + formGuidance,
+        content: currentMessages[systemIndex].content + guidance,
       }
     } else {
-      currentMessages.unshift({ role: 'system', content: formGuidance })
-    }
-  }
-
-  // Inject citation prompt if Tavily_web_search is enabled
-  if (
-    normalizedTools.some(
-      t => t.function?.name === 'Tavily_web_search' || t.function?.name === 'web_search',
-    )
-  ) {
-    const citationPrompt =
-      '\n\n[IMPORTANT] You have access to a "Tavily_web_search" tool. When you use this tool to answer a question, you MUST cite the search results in your answer using the format [1], [2], etc., corresponding to the index of the search result provided in the tool output. Do not fabricate citations.'
-
-    const systemMessageIndex = currentMessages.findIndex(m => m.role === 'system')
-    if (systemMessageIndex !== -1) {
-      currentMessages[systemMessageIndex].content += citationPrompt
-    } else {
-      currentMessages.unshift({ role: 'system', content: citationPrompt })
+      currentMessages.unshift({ role: 'system', content: guidance })
     }
   }
 
@@ -542,19 +660,25 @@ If you need to collect information, design ONE comprehensive form that gathers a
   const sourcesMap = new Map()
   // Initialize state accumulators and helpers (Function Scope)
   // This ensures they are available across loops and execution types
-  let fullContent = ''
-  let fullThought = ''
+  // Text/thought are collected as parts and joined once for the done event;
+  // contentLength tracks the text offset used to position tool calls.
+  const contentParts = []
+  const thoughtParts = []
+  let contentLength = 0
   const chunks = []
 
   // Emit helpers
   const emitText = text => {
     if (!text) return
-    fullContent += text
+    contentParts.push(text)
+    contentLength += text.length
     chunks.push({ type: 'text', content: text })
   }
-  const emitThought = text => {
-    if (!text) return
-    fullThought += text
+  // Reasoning fields are almost always strings already; only coerce the rest
+  const emitThought = value => {
+    if (!value) return
+    const text = typeof value === 'string' ? value : String(value)
+    thoughtParts.push(text)
     chunks.push({ type: 'thought', content: text })
   }
   // For SiliconFlow/DeepSeek, we rely on native reasoning_content field.
@@ -566,6 +690,63 @@ If you need to collect information, design ONE comprehensive form that gathers a
     enableTags: enableTagParsing,
   })
 
+  // Run one tool call. Never throws: failures come back as { error, errorMessage } so
+  // a batch of calls can run concurrently and still report each result separately.
+  const runToolCall = async (toolCall, parsedArgs) => {
+    const startedAt = performance.now()
+    const toolName = toolCall.function.name
+    const customTool = userToolsMap.get(toolName)
+    if (!customTool && !isLocalToolName(toolName)) {
+      const error = new Error(`Unknown tool: ${toolName}`)
+      return { error, errorMessage: error.message, durationMs: elapsedMs(startedAt) }
+    }
+    try {
+      const result = customTool
+        ? await executeCustomTool(customTool, parsedArgs || {})
+        : await executeToolByName(toolName, parsedArgs || {}, toolConfig)
+      return { result, durationMs: elapsedMs(startedAt) }
+    } catch (error) {
+      console.error(`Tool execution error (${toolName}):`, error)
+      return {
+        error,
+        errorMessage: `Tool execution failed: ${error.message}`,
+        durationMs: elapsedMs(startedAt),
+      }
+    }
+  }
+
+  // Execute a batch of tool calls concurrently. All tool_call events go out first;
+  // results and sources are then emitted in the model's call order, each as soon as
+  // it and every earlier call have finished. The assistant tool_calls message and
+  // the tool messages are appended to the history together once the batch is done.
+  async function* executeToolCalls(toolCalls) {
+    // Content stays empty when tool_calls are present so thinking content is not
+    // sent back to the model
+    const turnMessages = [{ role: 'assistant', content: '', tool_calls: toolCalls }]
+    const pending = []
+    for (const toolCall of toolCalls) {
+      const { parsedArgs, argumentsText } = parseToolCallArguments(getToolCallArguments(toolCall))
+      yield buildToolCallEvent(toolCall, argumentsText)
+      pending.push(runToolCall(toolCall, parsedArgs))
+    }
+    for (let i = 0; i < toolCalls.length; i += 1) {
+      const toolCall = toolCalls[i]
+      const toolName = toolCall.function.name
+      const { result, error, errorMessage, durationMs } = await pending[i]
+      if (!error && !userToolsMap.has(toolName)) {
+        collectToolSources(toolName, result, sourcesMap)
+      }
+      turnMessages.push({
+        role: 'tool',
+        tool_call_id: toolCall.id,
+        name: toolName,
+        content: JSON.stringify(error ? { error: errorMessage } : result),
+      })
+      yield buildToolResultEvent(toolCall, error || null, durationMs, result)
+    }
+    currentMessages.push(...turnMessages)
+  }
+
   // Tool calling loop
   let loops = 0
   const maxLoops = 10
@@ -606,8 +787,7 @@ If you need to collect information, design ONE comprehensive form that gathers a
 
       // Emit thought if present (from non-streaming adapter execution)
       if (thought) {
-        emitThought(String(thought))
-        fullThought += thought
+        emitThought(thought)
       }
 
       // Flush any accumulated chunks (especially thought) before tool execution
@@ -616,77 +796,8 @@ If you need to collect information, design ONE comprehensive form that gathers a
         chunks.length = 0 // Clear buffer
       }
 
-      // Add assistant message with tool_calls
-      currentMessages = [
-        ...currentMessages,
-        { role: 'assistant', content: '', tool_calls: toolCalls },
-      ]
-
-      // Execute each tool
-      for (const toolCall of toolCalls) {
-        const rawArgs = getToolCallArguments(toolCall)
-        // ... rest of loop handled by existing code ...
-        // We only need to output the beginning of the block to match
-        const parsedArgs = typeof rawArgs === 'string' ? safeJsonParse(rawArgs) : rawArgs || {}
-        yield buildToolCallEvent(toolCall, parsedArgs)
-        const startedAt = Date.now()
-        const toolName = toolCall.function.name
-
-        // Check if it's a user-defined custom tool
-        const isCustomTool = userToolsMap.has(toolName)
-
-        if (!isLocalToolName(toolName) && !isCustomTool) {
-          currentMessages.push({
-            role: 'tool',
-            tool_call_id: toolCall.id,
-            name: toolName,
-            content: JSON.stringify({ error: `Unknown tool: ${toolName}` }),
-          })
-          yield buildToolResultEvent(
-            toolCall,
-            new Error(`Unknown tool: ${toolName}`),
-            Date.now() - startedAt,
-          )
-          continue
-        }
-
-        try {
-          let result
-
-          // Execute custom tool or local tool
-          if (isCustomTool) {
-            const customTool = userToolsMap.get(toolName)
-            result = await executeCustomTool(customTool, parsedArgs || {})
-          } else {
-            result = await executeToolByName(toolName, parsedArgs || {}, toolConfig)
-            if (isSearchToolName(toolName)) {
-              if (toolName === 'search') {
-                //kimi search,待修改
-                collectKimiSources(result, sourcesMap)
-              } else {
-                collectWebSearchSources(result, sourcesMap)
-              }
-            }
-          }
-
-          currentMessages.push({
-            role: 'tool',
-            tool_call_id: toolCall.id,
-            name: toolName,
-            content: JSON.stringify(result),
-          })
-          yield buildToolResultEvent(toolCall, null, Date.now() - startedAt, result)
-        } catch (error) {
-          console.error(`Tool execution error (${toolName}):`, error)
-          currentMessages.push({
-            role: 'tool',
-            tool_call_id: toolCall.id,
-            name: toolName,
-            content: JSON.stringify({ error: `Tool execution failed: ${error.message}` }),
-          })
-          yield buildToolResultEvent(toolCall, error, Date.now() - startedAt)
-        }
-      }
+      // Execute each tool (also appends the assistant tool_calls turn to the history)
+      yield* executeToolCalls(toolCalls)
 
       // Continue loop with tool results
       continue
@@ -703,8 +814,7 @@ If you need to collect information, design ONE comprehensive form that gathers a
       const thought = execution.thought || response?.additional_kwargs?.reasoning_content || null
 
       if (thought) {
-        emitThought(String(thought))
-        fullThought += thought
+        emitThought(thought)
       }
 
       if (content) {
@@ -721,8 +831,8 @@ If you need to collect information, design ONE comprehensive form that gathers a
 
       yield {
         type: 'done',
-        content: fullContent,
-        thought: fullThought || undefined,
+        content: contentParts.join(''),
+        thought: thoughtParts.join('') || undefined,
         sources: sourcesMap.size ? Array.from(sourcesMap.values()) : undefined,
       }
       return
@@ -743,23 +853,28 @@ If you need to collect information, design ONE comprehensive form that gathers a
       const toolCallsByIndex = []
 
       let lastFinishReason = null
+      let chunkCount = 0
 
       // Process streaming chunks
       for await (const chunk of streamIterator) {
         const messageChunk = chunk?.message ?? chunk
         const contentValue = messageChunk?.content ?? chunk?.content
+        // Raw OpenAI-style choice/delta, looked up once per chunk
+        const additionalKwargs = messageChunk?.additional_kwargs
+        const rawChoice = additionalKwargs?.__raw_response?.choices?.[0]
+        const rawDelta = rawChoice?.delta
 
         // 1. Process reasoning/thinking content using adapter
         const reasoning = adapter.extractThinkingContent(messageChunk)
         if (reasoning) {
-          emitThought(String(reasoning))
+          emitThought(reasoning)
         }
 
         // 2. Process text content first so textIndex captures position AFTER this chunk's text
-        let chunkText = normalizeTextContent(contentValue)
+        let chunkText =
+          typeof contentValue === 'string' ? contentValue : normalizeTextContent(contentValue)
         if (!chunkText) {
-          const rawDeltaContent =
-            messageChunk?.additional_kwargs?.__raw_response?.choices?.[0]?.delta?.content
+          const rawDeltaContent = rawDelta?.content
           if (typeof rawDeltaContent === 'string' && rawDeltaContent) {
             chunkText = rawDeltaContent
           }
@@ -770,21 +885,17 @@ If you need to collect information, design ONE comprehensive form that gathers a
 
         // 3. Collect tool_calls from streaming chunks
         const toolCalls =
-          messageChunk?.tool_calls ||
-          messageChunk?.tool_call_chunks ||
-          messageChunk?.additional_kwargs?.tool_calls
+          messageChunk?.tool_calls || messageChunk?.tool_call_chunks || additionalKwargs?.tool_calls
         if (Array.isArray(toolCalls)) {
-          mergeToolCallsByIndex(toolCallsByIndex, toolCalls, fullContent.length)
+          mergeToolCallsByIndex(toolCallsByIndex, toolCalls, contentLength)
           updateToolCallsMap(toolCallsMap, toolCalls)
         }
 
         // 4. Also check raw response for tool calls
         const rawToolCalls =
-          messageChunk?.additional_kwargs?.__raw_response?.choices?.[0]?.delta?.tool_calls ||
-          messageChunk?.additional_kwargs?.__raw_response?.choices?.[0]?.tool_calls ||
-          messageChunk?.additional_kwargs?.__raw_response?.choices?.[0]?.delta?.tool_call_chunks
+          rawDelta?.tool_calls || rawChoice?.tool_calls || rawDelta?.tool_call_chunks
         if (Array.isArray(rawToolCalls)) {
-          mergeToolCallsByIndex(toolCallsByIndex, rawToolCalls, fullContent.length)
+          mergeToolCallsByIndex(toolCallsByIndex, rawToolCalls, contentLength)
           updateToolCallsMap(toolCallsMap, rawToolCalls)
         }
 
@@ -794,13 +905,15 @@ If you need to collect information, design ONE comprehensive form that gathers a
         }
 
         // Check finish reason
-        const finishReason =
-          messageChunk?.additional_kwargs?.__raw_response?.choices?.[0]?.finish_reason ||
-          chunk?.finish_reason ||
-          null
+        const finishReason = rawChoice?.finish_reason || chunk?.finish_reason || null
         if (finishReason) {
           lastFinishReason = finishReason
         }
+
+        chunkCount += 1
+        if (chunkCount % STREAM_YIELD_INTERVAL === 0) {
+          await yieldToEventLoop()
+        }
       }
 
       // Flush any buffered content
@@ -827,77 +940,8 @@ If you need to collect information, design ONE comprehensive form that gathers a
           .filter(toolCall => toolCall?.id && toolCall?.function?.name)
 
         if (assistantToolCalls.length > 0) {
-          // Add assistant message with tool_calls
-          // Note: content should be empty when tool_calls are present
-          // to avoid sending thinking content back to the model
-          currentMessages = [
-            ...currentMessages,
-            { role: 'assistant', content: '', tool_calls: assistantToolCalls },
-          ]
-
-          // Execute tools
-          for (const toolCall of assistantToolCalls) {
-            const rawArgs = getToolCallArguments(toolCall)
-            const parsedArgs = typeof rawArgs === 'string' ? safeJsonParse(rawArgs) : rawArgs || {}
-            yield buildToolCallEvent(toolCall, parsedArgs)
-            const startedAt = Date.now()
-            const toolName = toolCall.function.name
-
-            // Check if it's a user-defined custom tool
-            const isCustomTool = userToolsMap.has(toolName)
-
-            if (!isLocalToolName(toolName) && !isCustomTool) {
-              currentMessages.push({
-                role: 'tool',
-                tool_call_id: toolCall.id,
-                name: toolName,
-                content: JSON.stringify({ error: `Unknown tool: ${toolName}` }),
-              })
-              yield buildToolResultEvent(
-                toolCall,
-                new Error(`Unknown tool: ${toolName}`),
-                Date.now() - startedAt,
-              )
-              continue
-            }
-
-            try {
-              let result
-
-              // Execute custom tool or local tool
-              if (isCustomTool) {
-                const customTool = userToolsMap.get(toolName)
-                result = await executeCustomTool(customTool, parsedArgs || {})
-              } else {
-                result = await executeToolByName(toolName, parsedArgs || {}, toolConfig)
-                if (isSearchToolName(toolName)) {
-                  if (toolName === 'search') {
-                    //kimi search,名字待修改
-                    collectKimiSources(result, sourcesMap)
-                  } else {
-                    collectWebSearchSources(result, sourcesMap)
-                  }
-                }
-              }
-
-              currentMessages.push({
-                role: 'tool',
-                tool_call_id: toolCall.id,
-                name: toolName,
-                content: JSON.stringify(result),
-              })
-              yield buildToolResultEvent(toolCall, null, Date.now() - startedAt, result)
-            } catch (error) {
-              console.error(`Tool execution error (${toolName}):`, error)
-              currentMessages.push({
-                role: 'tool',
-                tool_call_id: toolCall.id,
-                name: toolName,
-                content: JSON.stringify({ error: `Tool execution failed: ${error.message}` }),
-              })
-              yield buildToolResultEvent(toolCall, error, Date.now() - startedAt)
-            }
-          }
+          // Execute tools (also appends the assistant tool_calls turn to the history)
+          yield* executeToolCalls(assistantToolCalls)
 
           // Continue loop with tool results
           continue
@@ -907,8 +951,8 @@ If you need to collect information, design ONE comprehensive form that gathers a
       // No more tool calls, streaming complete
       yield {
         type: 'done',
-        content: fullContent,
-        thought: fullThought || undefined,
+        content: contentParts.join(''),
+        thought: thoughtParts.join('') || undefined,
         sources: sourcesMap.size ? Array.from(sourcesMap.values()) : undefined,
       }
       return
@@ -1,9 +1,16 @@
 import { jsonrepair } from 'jsonrepair'
-import { all, create } from 'mathjs'
 import { z } from 'zod'
 import { ACADEMIC_DOMAINS } from './academicDomains.js'
 
-const math = create(all, {})
+// mathjs is the heaviest dependency here and only the calculator uses it, so it is
+// imported and instantiated on the first calculation instead of at startup
+let mathPromise = null
+const getMath = () => {
+  if (!mathPromise) {
+    mathPromise = import('mathjs').then(({ all, create }) => create(all, {}))
+  }
+  return mathPromise
+}
 
 const TOOL_ALIASES = {
   web_search: 'Tavily_web_search',
@@ -239,6 +246,9 @@ const AGENT_TOOLS = [
 
 // Combined list for execution and validation
 const ALL_TOOLS = [...GLOBAL_TOOLS, ...AGENT_TOOLS]
+// Checked for every tool call in a stream; O(1) instead of scanning ALL_TOOLS
+const LOCAL_TOOL_NAMES = new Set(ALL_TOOLS.map(tool => tool.name))
+const LOCAL_TOOL_IDS = new Set(ALL_TOOLS.map(tool => tool.id))
 
 const toolSchemas = {
   calculator: z.object({
@@ -286,13 +296,47 @@ const splitSentences = text => {
   return parts ? parts.map(item => item.trim()).filter(Boolean) : [text.trim()]
 }
 
-const safeEvaluate = expression => {
+// Intl.DateTimeFormat construction resolves locale data and the time zone,
+// so formatters are reused per locale + timezone
+const LOCAL_TIME_FORMATTER_LIMIT = 64
+const localTimeFormatters = new Map()
+let defaultTimeZone = null
+
+export const getDefaultTimeZone = () => {
+  if (!defaultTimeZone) defaultTimeZone = Intl.DateTimeFormat().resolvedOptions().timeZone
+  return defaultTimeZone
+}
+
+const getLocalTimeFormatter = (locale, timezone) => {
+  const key = `${locale}|${timezone}`
+  let formatter = localTimeFormatters.get(key)
+  if (!formatter) {
+    formatter = new Intl.DateTimeFormat(locale, {
+      timeZone: timezone,
+      year: 'numeric',
+      month: '2-digit',
+      day: '2-digit',
+      hour: '2-digit',
+      minute: '2-digit',
+      second: '2-digit',
+      hour12: false,
+    })
+    localTimeFormatters.set(key, formatter)
+    if (localTimeFormatters.size > LOCAL_TIME_FORMATTER_LIMIT) {
+      localTimeFormatters.delete(localTimeFormatters.keys().next().value)
+    }
+  }
+  return formatter
+}
+
+const safeEvaluate = async expression => {
   if (!expression || typeof expression !== 'string') {
     throw new Error('Expression is required')
   }
   if (!/^[0-9+\-*/%^().,\sA-Za-z_]*$/.test(expression)) {
     throw new Error('Expression contains unsupported characters')
   }
+  const math = await getMath()
   return math.evaluate(expression)
 }
 
@@ -306,218 +350,233 @@ export const listTools = () =>
     parameters: tool.parameters,
   }))
 
-export const getToolDefinitionsByIds = toolIds => {
-  if (!Array.isArray(toolIds) || toolIds.length === 0) return []
-  const idSet = new Set(toolIds.map(id => resolveToolName(String(id))))
-  // Agents can theoretically access global tools if manually added by ID, but listTools won't show them
-  return ALL_TOOLS.filter(tool => idSet.has(tool.id)).map(tool => ({
+// Function-calling definitions are static, so they are built once and shared across requests
+const TOOL_DEFINITIONS = ALL_TOOLS.map(tool => ({
+  id: tool.id,
+  definition: {
     type: 'function',
     function: {
       name: tool.name,
       description: tool.description,
       parameters: tool.parameters,
     },
-  }))
-}
+  },
+}))
 
-export const isLocalToolName = toolName =>
-  ALL_TOOLS.some(tool => tool.name === resolveToolName(toolName) || tool.id === toolName)
+// Agents send the same tool id list on every request, so resolved lists are reused
+// per id list. Cached arrays are frozen because every caller shares them.
+const TOOL_DEFINITIONS_CACHE_LIMIT = 128
+const toolDefinitionsCache = new Map()
 
-export const executeToolByName = async (toolName, args = {}, toolConfig = {}) => {
-  const resolvedToolName = resolveToolName(toolName)
-  const schema = toolSchemas[resolvedToolName]
-  if (!schema) {
-    throw new Error(`Unknown tool: ${toolName}`)
+export const getToolDefinitionsByIds = toolIds => {
+  if (!Array.isArray(toolIds) || toolIds.length === 0) return []
+  const key = toolIds.join('\n')
+  const cached = toolDefinitionsCache.get(key)
+  if (cached) return cached
+  const idSet = new Set(toolIds.map(id => resolveToolName(String(id))))
+  // Agents can theoretically access global tools if manually added by ID, but listTools won't show them
+  const definitions = []
+  for (const { id, definition } of TOOL_DEFINITIONS) {
+    if (idSet.has(id)) definitions.push(definition)
   }
-  const parsed = schema.safeParse(args || {})
-  if (!parsed.success) {
-    const details = parsed.error.issues.map(issue => issue.message).join('; ')
-    throw new Error(`Invalid tool arguments: ${details}`)
+  const frozen = Object.freeze(definitions)
+  toolDefinitionsCache.set(key, frozen)
+  if (toolDefinitionsCache.size > TOOL_DEFINITIONS_CACHE_LIMIT) {
+    toolDefinitionsCache.delete(toolDefinitionsCache.keys().next().value)
   }
+  return frozen
+}
 
-  const params = parsed.data
-  switch (resolvedToolName) {
-    case 'calculator': {
-      const value = safeEvaluate(params.expression)
-      return { result: value }
-    }
-    case 'local_time': {
-      const timezone = params.timezone || Intl.DateTimeFormat().resolvedOptions().timeZone
-      const locale = params.locale || 'en-US'
-      const now = new Date()
-      const formatted = new Intl.DateTimeFormat(locale, {
-        timeZone: timezone,
-        year: 'numeric',
-        month: '2-digit',
-        day: '2-digit',
-        hour: '2-digit',
-        minute: '2-digit',
-        second: '2-digit',
-        hour12: false,
-      }).format(now)
-      return { timezone, formatted, iso: now.toISOString() }
-    }
-    case 'summarize_text': {
-      const text = params.text || ''
-      const maxSentences = Number(params.max_sentences) || 3
-      const maxChars = Number(params.max_chars) || 600
-      const sentences = splitSentences(text).slice(0, maxSentences)
-      let summary = sentences.join(' ')
-      if (summary.length > maxChars) summary = summary.slice(0, maxChars).trim()
-      return { summary }
-    }
-    case 'extract_text': {
-      const text = params.text || ''
-      const query = (params.query || '').toLowerCase()
-      const maxSentences = Number(params.max_sentences) || 5
-      const sentences = splitSentences(text)
-      const matches = query
-        ? sentences.filter(sentence => sentence.toLowerCase().includes(query))
-        : sentences
-      return { extracted: matches.slice(0, maxSentences) }
-    }
-    case 'json_repair': {
-      const text = params.text || ''
+export const isLocalToolName = toolName =>
+  LOCAL_TOOL_NAMES.has(resolveToolName(toolName)) || LOCAL_TOOL_IDS.has(toolName)
+
+// Resolved tool name -> implementation; params are already validated against toolSchemas
+const TOOL_HANDLERS = {
+  calculator: async params => {
+    const value = await safeEvaluate(params.expression)
+    return { result: value }
+  },
+  local_time: params => {
+    const timezone = params.timezone || getDefaultTimeZone()
+    const locale = params.locale || 'en-US'
+    const now = new Date()
+    const formatted = getLocalTimeFormatter(locale, timezone).format(now)
+    return { timezone, formatted, iso: now.toISOString() }
+  },
+  summarize_text: params => {
+    const text = params.text || ''
+    const maxSentences = Number(params.max_sentences) || 3
+    const maxChars = Number(params.max_chars) || 600
+    const sentences = splitSentences(text).slice(0, maxSentences)
+    let summary = sentences.join(' ')
+    if (summary.length > maxChars) summary = summary.slice(0, maxChars).trim()
+    return { summary }
+  },
+  extract_text: params => {
+    const text = params.text || ''
+    const query = (params.query || '').toLowerCase()
+    const maxSentences = Number(params.max_sentences) || 5
+    const sentences = splitSentences(text)
+    const matches = query
+      ? sentences.filter(sentence => sentence.toLowerCase().includes(query))
+      : sentences
+    return { extracted: matches.slice(0, maxSentences) }
+  },
+  json_repair: params => {
+    const text = params.text || ''
+    try {
+      const parsed = JSON.parse(text)
+      return { valid: true, repaired: text, data: parsed }
+    } catch (error) {
       try {
-        const parsed = JSON.parse(text)
-        return { valid: true, repaired: text, data: parsed }
-      } catch (error) {
-        try {
-          const repaired = jsonrepair(text)
-          const parsed = JSON.parse(repaired)
-          return { valid: false, repaired, data: parsed }
-        } catch (repairError) {
-          return {
-            valid: false,
-            error: repairError?.message || 'Unable to repair JSON',
-          }
+        const repaired = jsonrepair(text)
+        const parsed = JSON.parse(repaired)
+        return { valid: false, repaired, data: parsed }
+      } catch (repairError) {
+        return {
+          valid: false,
+          error: repairError?.message || 'Unable to repair JSON',
         }
       }
     }
-    case 'webpage_reader': {
-      const inputUrl = params.url.trim()
-      const normalized = inputUrl.replace(/^https?:\/\/r\.jina\.ai\//i, '')
-      const requestUrl = `https://r.jina.ai/${normalized}`
-
-      try {
-        const response = await fetch(requestUrl, {
-          headers: {
-            Accept: 'text/plain',
-          },
-        })
+  },
+  webpage_reader: async params => {
+    const inputUrl = params.url.trim()
+    const normalized = inputUrl.replace(/^https?:\/\/r\.jina\.ai\//i, '')
+    const requestUrl = `https://r.jina.ai/${normalized}`
 
-        if (!response.ok) {
-          throw new Error(`Jina AI reader error: ${response.statusText}`)
-        }
+    try {
+      const response = await fetch(requestUrl, {
+        headers: {
+          Accept: 'text/plain',
+        },
+      })
 
-        const content = await response.text()
-        return {
-          url: normalized,
-          content,
-          source: 'jina.ai',
-        }
-      } catch (error) {
-        throw new Error(`Webpage read failed: ${error.message}`)
+      if (!response.ok) {
+        throw new Error(`Jina AI reader error: ${response.statusText}`)
       }
-    }
-    case 'Tavily_web_search': {
-      const query = params.query
-      const maxResults = params.max_results || 5
-      const apiKey = resolveTavilyApiKey(toolConfig)
 
-      if (!apiKey) {
-        throw new Error('Tavily API key not configured. Set TAVILY_API_KEY or add it in settings.')
+      const content = await response.text()
+      return {
+        url: normalized,
+        content,
+        source: 'jina.ai',
       }
+    } catch (error) {
+      throw new Error(`Webpage read failed: ${error.message}`)
+    }
+  },
+  Tavily_web_search: async (params, toolConfig) => {
+    const query = params.query
+    const maxResults = params.max_results || 5
+    const apiKey = resolveTavilyApiKey(toolConfig)
 
-      try {
-        const response = await fetch('https://api.tavily.com/search', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify({
-            api_key: apiKey,
-            query,
-            search_depth: 'basic',
-            include_answer: true,
-            max_results: maxResults,
-          }),
-        })
-
-        if (!response.ok) {
-          throw new Error(`Tavily API error: ${response.statusText}`)
-        }
+    if (!apiKey) {
+      throw new Error('Tavily API key not configured. Set TAVILY_API_KEY or add it in settings.')
+    }
 
-        const data = await response.json()
+    try {
+      const response = await fetch('https://api.tavily.com/search', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          api_key: apiKey,
+          query,
+          search_depth: 'basic',
+          include_answer: true,
+          max_results: maxResults,
+        }),
+      })
 
-        // Return structured results
-        return {
-          answer: data.answer,
-          results: data.results.map(r => ({
-            title: r.title,
-            url: r.url,
-            content: r.content,
-          })),
-        }
-      } catch (error) {
-        throw new Error(`Search failed: ${error.message}`)
+      if (!response.ok) {
+        throw new Error(`Tavily API error: ${response.statusText}`)
       }
-    }
-    case 'Tavily_academic_search': {
-      const query = params.query
-      const maxResults = params.max_results || 5
-      const apiKey = resolveTavilyApiKey(toolConfig)
 
-      if (!apiKey) {
-        throw new Error('Tavily API key not configured. Set TAVILY_API_KEY or add it in settings.')
+      const data = await response.json()
+
+      // Return structured results
+      return {
+        answer: data.answer,
+        results: data.results.map(r => ({
+          title: r.title,
+          url: r.url,
+          content: r.content,
+        })),
       }
+    } catch (error) {
+      throw new Error(`Search failed: ${error.message}`)
+    }
+  },
+  Tavily_academic_search: async (params, toolConfig) => {
+    const query = params.query
+    const maxResults = params.max_results || 5
+    const apiKey = resolveTavilyApiKey(toolConfig)
 
-      try {
-        const response = await fetch('https://api.tavily.com/search', {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify({
-            api_key: apiKey,
-            query,
-            search_depth: 'advanced', // Use advanced search for academic queries
-            include_domains: ACADEMIC_DOMAINS,
-            include_answer: true,
-            max_results: maxResults,
-          }),
-        })
-
-        if (!response.ok) {
-          throw new Error(`Tavily API error: ${response.statusText}`)
-        }
+    if (!apiKey) {
+      throw new Error('Tavily API key not configured. Set TAVILY_API_KEY or add it in settings.')
+    }
 
-        const data = await response.json()
+    try {
+      const response = await fetch('https://api.tavily.com/search', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          api_key: apiKey,
+          query,
+          search_depth: 'advanced', // Use advanced search for academic queries
+          include_domains: ACADEMIC_DOMAINS,
+          include_answer: true,
+          max_results: maxResults,
+        }),
+      })
 
-        // Return structured academic results
-        return {
-          answer: data.answer,
-          results: data.results.map(r => ({
-            title: r.title,
-            url: r.url,
-            content: r.content,
-            score: r.score || null, // Relevance score if available
-          })),
-          query_type: 'academic',
-        }
-      } catch (error) {
-        throw new Error(`Academic search failed: ${error.message}`)
+      if (!response.ok) {
+        throw new Error(`Tavily API error: ${response.statusText}`)
       }
-    }
-    case 'interactive_form': {
-      // This is a client-side interaction tool
-      // We just pass the parameters through to the frontend
+
+      const data = await response.json()
+
+      // Return structured academic results
       return {
-        ...params,
-        kind: 'interactive_form', // Marker for frontend logic
+        answer: data.answer,
+        results: data.results.map(r => ({
+          title: r.title,
+          url: r.url,
+          content: r.content,
+          score: r.score || null, // Relevance score if available
+        })),
+        query_type: 'academic',
       }
+    } catch (error) {
+      throw new Error(`Academic search failed: ${error.message}`)
+    }
+  },
+  interactive_form: params => {
+    // This is a client-side interaction tool
+    // We just pass the parameters through to the frontend
+    return {
+      ...params,
+      kind: 'interactive_form', // Marker for frontend logic
     }
-    default:
-      throw new Error(`Unknown tool: ${toolName}`)
+  },
+}
+
+export const executeToolByName = async (toolName, args = {}, toolConfig = {}) => {
+  const resolvedToolName = resolveToolName(toolName)
+  const schema = toolSchemas[resolvedToolName]
+  const handler = TOOL_HANDLERS[resolvedToolName]
+  if (!schema || !handler) {
+    throw new Error(`Unknown tool: ${toolName}`)
   }
+  const parsed = schema.safeParse(args || {})
+  if (!parsed.success) {
+    const details = parsed.error.issues.map(issue => issue.message).join('; ')
+    throw new Error(`Invalid tool arguments: ${details}`)
+  }
+
+  return handler(parsed.data, toolConfig)
 }
@@ -15,7 +15,10 @@ export const createSseStream = (res, config = {}) => {
   const heartbeatMs = Number.isFinite(config.heartbeatMs)
     ? config.heartbeatMs
     : DEFAULT_HEARTBEAT_MS
-  let buffer = ''
+  // Pending frames are joined once per flush instead of concatenated per event
+  const pending = []
+  // Adjacent text/thought deltas are merged into one event until something else is sent
+  let pendingDelta = null
   let flushTimer = null
   let heartbeatTimer = null
 
@@ -30,10 +33,20 @@ export const createSseStream = (res, config = {}) => {
     res.socket.setTimeout(0)
   }
 
+  const serializeEvent = data => `data: ${JSON.stringify(data)}\n\n`
+
+  const flushDelta = () => {
+    if (!pendingDelta) return
+    pending.push(serializeEvent(pendingDelta))
+    pendingDelta = null
+  }
+
   const flush = () => {
-    if (!buffer || res.writableEnded || res.writableFinished) return
-    res.write(buffer)
-    buffer = ''
+    flushDelta()
+    if (pending.length === 0 || res.writableEnded || res.writableFinished) return
+    const payload = pending.length === 1 ? pending[0] : pending.join('')
+    pending.length = 0
+    res.write(payload)
   }
 
   const scheduleFlush = () => {
@@ -46,7 +59,8 @@ export const createSseStream = (res, config = {}) => {
 
   const writeRaw = (text, immediate = false) => {
     if (res.writableEnded || res.writableFinished) return
-    buffer += text
+    flushDelta()
+    pending.push(text)
     if (immediate || flushMs <= 0) {
       flush()
     } else {
@@ -58,8 +72,25 @@ export const createSseStream = (res, config = {}) => {
     writeRaw(`:${comment}\n\n`, true)
   }
 
+  // Only plain { type, content } deltas are merged; anything with extra fields is sent as-is
+  const isMergeableDelta = data =>
+    (data?.type === 'text' || data?.type === 'thought') &&
+    typeof data.content === 'string' &&
+    Object.keys(data).length === 2
+
   const sendEvent = data => {
-    writeRaw(`data: ${JSON.stringify(data)}\n\n`)
+    if (flushMs > 0 && isMergeableDelta(data)) {
+      if (res.writableEnded || res.writableFinished) return
+      if (pendingDelta?.type === data.type) {
+        pendingDelta.content += data.content
+      } else {
+        flushDelta()
+        pendingDelta = { type: data.type, content: data.content }
+      }
+      scheduleFlush()
+      return
+    }
+    writeRaw(serializeEvent(data))
   }
 
   if (heartbeatMs > 0) {
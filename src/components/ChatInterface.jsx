@@ -1750,6 +1750,7 @@ const ChatInterface = ({
         credentials.apiKey,
         credentials.baseUrl,
         modelConfig.model,
+        { regenerate: true },
       )
       const newTitle = titleResult?.title || ''
       if (!newTitle) return
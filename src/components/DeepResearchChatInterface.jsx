@@ -1492,6 +1492,7 @@ const DeepResearchChatInterface = ({
         credentials.apiKey,
         credentials.baseUrl,
         modelConfig.model,
+        { regenerate: true },
       )
       const newTitle = titleResult?.title || ''
       if (!newTitle) return
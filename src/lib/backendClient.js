@@ -37,9 +37,17 @@ const getBackendErrorMessage = (error, status) => {
  * @param {string} apiKey - API key for the provider
  * @param {string} baseUrl - Optional custom base URL
  * @param {string} model - Optional model name
+ * @param {Object} [options] - { regenerate } to skip the backend's cached title
  * @returns {Promise<{title: string, emojis?: string[]}>}
  */
-export const generateTitleViaBackend = async (provider, message, apiKey, baseUrl, model) => {
+export const generateTitleViaBackend = async (
+  provider,
+  message,
+  apiKey,
+  baseUrl,
+  model,
+  options = {},
+) => {
   const response = await fetch(`${getBackendUrl()}/api/title`, {
     method: 'POST',
     headers: {
@@ -51,6 +59,7 @@ export const generateTitleViaBackend = async (provider, message, apiKey, baseUrl
       apiKey,
       baseUrl,
       model,
+      regenerate: options.regenerate === true,
     }),
   })
 
@@ -16,8 +16,15 @@ import {
   streamResearchPlanViaBackend,
 } from './backendClient.js'
 
-const generateTitle = async (provider, firstMessage, apiKey, baseUrl, model) => {
-  const result = await generateTitleViaBackend(provider, firstMessage, apiKey, baseUrl, model)
+const generateTitle = async (provider, firstMessage, apiKey, baseUrl, model, options) => {
+  const result = await generateTitleViaBackend(
+    provider,
+    firstMessage,
+    apiKey,
+    baseUrl,
+    model,
+    options,
+  )
   return {
     title: result?.title || 'New Conversation',
     emojis: Array.isArray(result?.emojis) ? result.emojis : [],
@@ -166,8 +173,8 @@ const generateRelatedQuestions = async (provider, messages, apiKey, baseUrl, mod
 export const createBackendProvider = provider => ({
   streamChatCompletion: params => streamChatViaBackend({ provider, ...params }),
   streamDeepResearch: params => streamDeepResearchViaBackend({ provider, ...params }),
-  generateTitle: (firstMessage, apiKey, baseUrl, model) =>
-    generateTitle(provider, firstMessage, apiKey, baseUrl, model),
+  generateTitle: (firstMessage, apiKey, baseUrl, model, options) =>
+    generateTitle(provider, firstMessage, apiKey, baseUrl, model, options),
   generateResearchPlan: (userMessage, apiKey, baseUrl, model, researchType) =>
     generateResearchPlan(provider, userMessage, apiKey, baseUrl, model, researchType),
   streamResearchPlan: (userMessage, apiKey, baseUrl, model, callbacks) =>
@@ -1304,6 +1304,17 @@ const callAIAPI = async (
       signal: controller.signal,
       onChunk: chunk => {
         if (typeof chunk === 'object' && chunk !== null) {
+          // Text/thought deltas are nearly every chunk, so they are matched first
+          if (chunk.type === 'text') {
+            pendingText += chunk.content
+            queueFlush()
+            return
+          }
+          if (chunk.type === 'thought') {
+            pendingThought += chunk.content
+            queueFlush()
+            return
+          }
           if (chunk.type === 'research_step') {
             set(state => {
               const updated = [...state.messages]
@@ -1413,11 +1424,6 @@ const callAIAPI = async (
             })
             return
           }
-          if (chunk.type === 'thought') {
-            pendingThought += chunk.content
-          } else if (chunk.type === 'text') {
-            pendingText += chunk.content
-          }
         } else {
           // Fallback for string chunks
           pendingText += chunk